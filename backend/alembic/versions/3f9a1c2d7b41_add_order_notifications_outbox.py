@@ -0,0 +1,49 @@
+"""Add order_notifications outbox
+
+Revision ID: 3f9a1c2d7b41
+Revises: 052e74be8b59
+Create Date: 2026-10-17 09:12:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c2d7b41'
+down_revision: Union[str, Sequence[str], None] = '052e74be8b59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('order_notifications',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('phone', sa.String(), nullable=False),
+    sa.Column('customer_name', sa.String(), nullable=True),
+    sa.Column('order_number', sa.String(), nullable=False),
+    sa.Column('order_status', sa.String(), nullable=False),
+    sa.Column('template_name', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_order_notifications_id'), 'order_notifications', ['id'], unique=False)
+    op.create_index('ix_order_notifications_status_id', 'order_notifications', ['status', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_order_notifications_status_id', table_name='order_notifications')
+    op.drop_index(op.f('ix_order_notifications_id'), table_name='order_notifications')
+    op.drop_table('order_notifications')
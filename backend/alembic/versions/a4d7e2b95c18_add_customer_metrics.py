@@ -0,0 +1,50 @@
+"""Add customer_metrics
+
+Revision ID: a4d7e2b95c18
+Revises: f1c6a2e84b39
+Create Date: 2026-10-17 19:12:08.504311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d7e2b95c18'
+down_revision: Union[str, Sequence[str], None] = 'f1c6a2e84b39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled lazily on first read and by the nightly refresh_customer_metrics_task
+    op.create_table('customer_metrics',
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('total_spent', sa.Float(), nullable=False),
+    sa.Column('first_order_date', sa.DateTime(), nullable=True),
+    sa.Column('last_order_date', sa.DateTime(), nullable=True),
+    sa.Column('classification', sa.String(), nullable=False),
+    sa.Column('churn_risk', sa.String(), nullable=False),
+    sa.Column('spending_classification', sa.String(), nullable=False),
+    sa.Column('segment', sa.String(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('customer_id')
+    )
+    op.create_index('ix_customer_metrics_client_id_churn_risk', 'customer_metrics', ['client_id', 'churn_risk'], unique=False)
+    op.create_index('ix_customer_metrics_client_id_classification', 'customer_metrics', ['client_id', 'classification'], unique=False)
+    op.create_index('ix_customer_metrics_client_id_segment', 'customer_metrics', ['client_id', 'segment'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_customer_metrics_client_id_segment', table_name='customer_metrics')
+    op.drop_index('ix_customer_metrics_client_id_classification', table_name='customer_metrics')
+    op.drop_index('ix_customer_metrics_client_id_churn_risk', table_name='customer_metrics')
+    op.drop_table('customer_metrics')
@@ -0,0 +1,39 @@
+"""Add customer_segment_models
+
+Revision ID: b2f8c4e61d73
+Revises: a4d7e2b95c18
+Create Date: 2026-10-17 20:03:51.227946
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2f8c4e61d73'
+down_revision: Union[str, Sequence[str], None] = 'a4d7e2b95c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Trained by the nightly refresh_customer_metrics_task
+    op.create_table('customer_segment_models',
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('feature_means', sa.Text(), nullable=False),
+    sa.Column('feature_scales', sa.Text(), nullable=False),
+    sa.Column('centroids', sa.Text(), nullable=False),
+    sa.Column('segments', sa.Text(), nullable=False),
+    sa.Column('customer_count', sa.Integer(), nullable=False),
+    sa.Column('trained_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('client_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('customer_segment_models')
@@ -0,0 +1,98 @@
+"""Scope products by client
+
+Revision ID: b7d2e8f4a913
+Revises: 9c41e7a2b5d8
+Create Date: 2026-10-17 11:48:52.907136
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e8f4a913'
+down_revision: Union[str, Sequence[str], None] = '9c41e7a2b5d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # order_items.product_id keeps the WooCommerce product ID, which is no
+    # longer unique across clients
+    op.drop_constraint('order_items_product_id_fkey', 'order_items', type_='foreignkey')
+    op.drop_index(op.f('ix_products_external_id'), table_name='products')
+    op.add_column('products', sa.Column('client_id', sa.Integer(), nullable=True))
+
+    # Attribute each product to the client whose orders reference it most
+    op.execute("""
+        UPDATE products p
+        SET client_id = src.client_id
+        FROM (
+            SELECT DISTINCT ON (oi.product_id) oi.product_id, c.client_id
+            FROM order_items oi
+            JOIN orders o ON o.id = oi.order_id
+            JOIN customers c ON c.id = o.customer_id
+            WHERE oi.product_id IS NOT NULL
+            GROUP BY oi.product_id, c.client_id
+            ORDER BY oi.product_id, count(*) DESC
+        ) src
+        WHERE p.external_id = src.product_id
+    """)
+    # Other clients whose orders reference the same product ID get their own copy
+    op.execute("""
+        INSERT INTO products (
+            client_id, external_id, name, short_description, regular_price, sales_price,
+            total_sales, categories, stock_status, weight, date_created, date_modified
+        )
+        SELECT DISTINCT ON (c.client_id, p.external_id)
+            c.client_id, p.external_id, p.name, p.short_description, p.regular_price, p.sales_price,
+            p.total_sales, p.categories, p.stock_status, p.weight, p.date_created, p.date_modified
+        FROM products p
+        JOIN order_items oi ON oi.product_id = p.external_id
+        JOIN orders o ON o.id = oi.order_id
+        JOIN customers c ON c.id = o.customer_id
+        WHERE p.client_id IS NOT NULL AND c.client_id <> p.client_id
+        ORDER BY c.client_id, p.external_id, p.id
+    """)
+    # Single-store installs: everything else belongs to that store
+    op.execute("""
+        UPDATE products
+        SET client_id = (SELECT min(id) FROM clients)
+        WHERE client_id IS NULL AND (SELECT count(*) FROM clients) = 1
+    """)
+    # Unattributable products are dropped and the product watermarks reset, so
+    # the next product sync of every client is a full one that refills its catalog
+    op.execute("DELETE FROM products WHERE client_id IS NULL")
+    op.execute("""
+        DELETE FROM sync_state
+        WHERE key LIKE 'last_product_sync_client_%'
+           OR key LIKE 'last_product_reconcile_client_%'
+    """)
+
+    op.alter_column('products', 'client_id', existing_type=sa.Integer(), nullable=False)
+    op.create_foreign_key('products_client_id_fkey', 'products', 'clients', ['client_id'], ['id'], ondelete='CASCADE')
+    op.create_unique_constraint('uq_products_client_id_external_id', 'products', ['client_id', 'external_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_products_client_id_external_id', 'products', type_='unique')
+    op.drop_constraint('products_client_id_fkey', 'products', type_='foreignkey')
+    op.drop_column('products', 'client_id')
+    # Keep one row per WooCommerce ID so the global unique index can come back
+    op.execute("""
+        DELETE FROM products p
+        USING products dup
+        WHERE p.external_id = dup.external_id AND p.id > dup.id
+    """)
+    op.create_index(op.f('ix_products_external_id'), 'products', ['external_id'], unique=True)
+    op.execute("""
+        UPDATE order_items
+        SET product_id = NULL
+        WHERE product_id IS NOT NULL
+          AND product_id NOT IN (SELECT external_id FROM products WHERE external_id IS NOT NULL)
+    """)
+    op.create_foreign_key('order_items_product_id_fkey', 'order_items', 'products', ['product_id'], ['external_id'], ondelete='SET NULL')
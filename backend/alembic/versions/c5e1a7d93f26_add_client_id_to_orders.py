@@ -0,0 +1,74 @@
+"""Add client_id to orders and order_items
+
+Revision ID: c5e1a7d93f26
+Revises: b7d2e8f4a913
+Create Date: 2026-10-17 14:06:31.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e1a7d93f26'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e8f4a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('client_id', sa.Integer(), nullable=True))
+    op.add_column('order_items', sa.Column('client_id', sa.Integer(), nullable=True))
+
+    op.execute("""
+        UPDATE orders o
+        SET client_id = c.client_id
+        FROM customers c
+        WHERE c.id = o.customer_id
+    """)
+    # Orders whose customer was deleted are attributed through their products
+    # when those all belong to one store, or to the only store there is.
+    # Anything still unattributed is kept with a NULL client_id
+    op.execute("""
+        UPDATE orders o
+        SET client_id = src.client_id
+        FROM (
+            SELECT oi.order_id, min(p.client_id) AS client_id
+            FROM order_items oi
+            JOIN products p ON p.external_id = oi.product_id
+            GROUP BY oi.order_id
+            HAVING count(DISTINCT p.client_id) = 1
+        ) src
+        WHERE o.client_id IS NULL AND o.id = src.order_id
+    """)
+    op.execute("""
+        UPDATE orders
+        SET client_id = (SELECT min(id) FROM clients)
+        WHERE client_id IS NULL AND (SELECT count(*) FROM clients) = 1
+    """)
+    op.execute("""
+        UPDATE order_items oi
+        SET client_id = o.client_id
+        FROM orders o
+        WHERE o.id = oi.order_id
+    """)
+
+    op.create_foreign_key('orders_client_id_fkey', 'orders', 'clients', ['client_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('order_items_client_id_fkey', 'order_items', 'clients', ['client_id'], ['id'], ondelete='CASCADE')
+    op.create_index('ix_orders_client_id_status_created_at', 'orders', ['client_id', 'status', 'created_at'], unique=False)
+    op.create_index('ix_orders_client_id_created_at', 'orders', ['client_id', 'created_at'], unique=False)
+    op.create_index('ix_order_items_client_id_product_id', 'order_items', ['client_id', 'product_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_order_items_client_id_product_id', table_name='order_items')
+    op.drop_index('ix_orders_client_id_created_at', table_name='orders')
+    op.drop_index('ix_orders_client_id_status_created_at', table_name='orders')
+    op.drop_constraint('order_items_client_id_fkey', 'order_items', type_='foreignkey')
+    op.drop_constraint('orders_client_id_fkey', 'orders', type_='foreignkey')
+    op.drop_column('order_items', 'client_id')
+    op.drop_column('orders', 'client_id')
@@ -0,0 +1,56 @@
+"""Add customers table columns to customer_metrics
+
+Revision ID: c9e3a5f27b41
+Revises: b2f8c4e61d73
+Create Date: 2026-10-17 21:26:14.830562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e3a5f27b41'
+down_revision: Union[str, Sequence[str], None] = 'b2f8c4e61d73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('customer_metrics', sa.Column('customer_name', sa.String(), server_default='Unknown', nullable=False))
+    op.add_column('customer_metrics', sa.Column('total_orders', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('customer_metrics', sa.Column('total_spending', sa.Float(), server_default='0', nullable=False))
+    # Backfill; same aggregates as tasks.customer_metrics._customer_aggregates_query
+    op.execute("""
+        UPDATE customer_metrics m
+        SET customer_name = a.customer_name, total_orders = a.total_orders, total_spending = a.total_spending
+        FROM (
+            SELECT c.id,
+                   coalesce(nullif(trim(concat_ws(' ', c.first_name, c.last_name)), ''), 'Unknown') AS customer_name,
+                   count(o.id) AS total_orders,
+                   coalesce(sum(o.total_amount) FILTER (WHERE o.status IN ('completed', 'wc-completed')), 0) AS total_spending
+            FROM customers c
+            LEFT JOIN orders o ON o.customer_id = c.id AND o.client_id = c.client_id
+            GROUP BY c.id
+        ) a
+        WHERE a.id = m.customer_id
+    """)
+    op.alter_column('customer_metrics', 'customer_name', server_default=None)
+    op.alter_column('customer_metrics', 'total_orders', server_default=None)
+    op.alter_column('customer_metrics', 'total_spending', server_default=None)
+    op.create_index('ix_customer_metrics_table_name', 'customer_metrics', ['client_id', 'customer_name', 'customer_id'], unique=False, postgresql_where=sa.text('total_orders > 0'))
+    op.create_index('ix_customer_metrics_table_orders', 'customer_metrics', ['client_id', 'total_orders', 'customer_id'], unique=False, postgresql_where=sa.text('total_orders > 0'))
+    op.create_index('ix_customer_metrics_table_spending', 'customer_metrics', ['client_id', 'total_spending', 'customer_id'], unique=False, postgresql_where=sa.text('total_orders > 0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_customer_metrics_table_spending', table_name='customer_metrics', postgresql_where=sa.text('total_orders > 0'))
+    op.drop_index('ix_customer_metrics_table_orders', table_name='customer_metrics', postgresql_where=sa.text('total_orders > 0'))
+    op.drop_index('ix_customer_metrics_table_name', table_name='customer_metrics', postgresql_where=sa.text('total_orders > 0'))
+    op.drop_column('customer_metrics', 'total_spending')
+    op.drop_column('customer_metrics', 'total_orders')
+    op.drop_column('customer_metrics', 'customer_name')
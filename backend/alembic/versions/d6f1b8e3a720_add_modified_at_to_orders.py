@@ -0,0 +1,28 @@
+"""Add modified_at to orders
+
+Revision ID: d6f1b8e3a720
+Revises: c9e3a5f27b41
+Create Date: 2026-10-17 23:12:47.205913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6f1b8e3a720'
+down_revision: Union[str, Sequence[str], None] = 'c9e3a5f27b41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('modified_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('orders', 'modified_at')
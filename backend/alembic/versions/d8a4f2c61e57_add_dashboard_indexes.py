@@ -0,0 +1,48 @@
+"""Add dashboard indexes
+
+Revision ID: d8a4f2c61e57
+Revises: c5e1a7d93f26
+Create Date: 2026-10-17 15:22:09.741385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a4f2c61e57'
+down_revision: Union[str, Sequence[str], None] = 'c5e1a7d93f26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Foreign keys used by joins and cascading deletes
+    op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False)
+    op.create_index(op.f('ix_orders_customer_id'), 'orders', ['customer_id'], unique=False)
+    op.create_index(op.f('ix_customers_client_id'), 'customers', ['client_id'], unique=False)
+    op.create_index(op.f('ix_addresses_customer_id'), 'addresses', ['customer_id'], unique=False)
+
+    op.drop_index('ix_orders_client_id_created_at', table_name='orders')
+    op.create_index('ix_orders_client_id_created_at', 'orders', ['client_id', 'created_at'], unique=False,
+                    postgresql_include=['status', 'total_amount'])
+    op.create_index('ix_orders_completed_client_id_created_at', 'orders', ['client_id', 'created_at'], unique=False,
+                    postgresql_include=['status', 'total_amount', 'customer_id'],
+                    postgresql_where=sa.text("status IN ('completed', 'wc-completed')"))
+    op.create_index('ix_order_items_client_id_product_name', 'order_items', ['client_id', 'product_name'], unique=False,
+                    postgresql_include=['order_id', 'quantity'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_order_items_client_id_product_name', table_name='order_items')
+    op.drop_index('ix_orders_completed_client_id_created_at', table_name='orders')
+    op.drop_index('ix_orders_client_id_created_at', table_name='orders')
+    op.create_index('ix_orders_client_id_created_at', 'orders', ['client_id', 'created_at'], unique=False)
+    op.drop_index(op.f('ix_addresses_customer_id'), table_name='addresses')
+    op.drop_index(op.f('ix_customers_client_id'), table_name='customers')
+    op.drop_index(op.f('ix_orders_customer_id'), table_name='orders')
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
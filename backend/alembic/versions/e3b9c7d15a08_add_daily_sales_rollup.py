@@ -0,0 +1,51 @@
+"""Add daily_sales_rollup
+
+Revision ID: e3b9c7d15a08
+Revises: d8a4f2c61e57
+Create Date: 2026-10-17 16:40:12.305917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b9c7d15a08'
+down_revision: Union[str, Sequence[str], None] = 'd8a4f2c61e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_sales_rollup',
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('item_quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('client_id', 'day', 'status')
+    )
+    # Backfill; same query as tasks.sales_rollup.rebuild_daily_sales_rollup for all clients
+    op.execute("""
+        INSERT INTO daily_sales_rollup (client_id, day, status, order_count, revenue, item_quantity)
+        SELECT o.client_id, o.created_at::date, o.status,
+               count(*), coalesce(sum(o.total_amount), 0), coalesce(sum(i.quantity), 0)
+        FROM orders o
+        LEFT JOIN (
+            SELECT order_id, sum(quantity) AS quantity
+            FROM order_items
+            GROUP BY order_id
+        ) i ON i.order_id = o.id
+        WHERE o.client_id IS NOT NULL
+        GROUP BY o.client_id, o.created_at::date, o.status
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_sales_rollup')
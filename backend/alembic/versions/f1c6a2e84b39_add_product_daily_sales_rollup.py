@@ -0,0 +1,50 @@
+"""Add product_daily_sales_rollup
+
+Revision ID: f1c6a2e84b39
+Revises: e3b9c7d15a08
+Create Date: 2026-10-17 17:55:43.182660
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c6a2e84b39'
+down_revision: Union[str, Sequence[str], None] = 'e3b9c7d15a08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('product_daily_sales_rollup',
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('product_name', sa.String(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('client_id', 'day', 'status', 'product_id', 'product_name')
+    )
+    op.create_index('ix_product_daily_sales_rollup_client_id_product_id_day', 'product_daily_sales_rollup', ['client_id', 'product_id', 'day'], unique=False)
+    # Backfill; same query as tasks.sales_rollup.rebuild_daily_sales_rollup for all clients
+    op.execute("""
+        INSERT INTO product_daily_sales_rollup (client_id, day, status, product_id, product_name, quantity, revenue)
+        SELECT o.client_id, o.created_at::date, o.status, coalesce(oi.product_id, 0), oi.product_name,
+               sum(oi.quantity), sum(oi.quantity * oi.price)
+        FROM order_items oi
+        JOIN orders o ON o.id = oi.order_id
+        WHERE o.client_id IS NOT NULL
+        GROUP BY o.client_id, o.created_at::date, o.status, coalesce(oi.product_id, 0), oi.product_name
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_product_daily_sales_rollup_client_id_product_id_day', table_name='product_daily_sales_rollup')
+    op.drop_table('product_daily_sales_rollup')
@@ -13,7 +13,10 @@ from tasks.sending_to_low_churn_customers import helper_function_to_sending_mess
 from database import SessionLocal
 from models import Client
 from tasks.fetch_orders import fetch_orders_task
+from tasks.poll_scheduler import get_due_clients
 from tasks.fetch_products import fetch_products_task
+from tasks.order_notifications import send_order_notifications_task
+from tasks.customer_metrics import refresh_customer_metrics_task
 from datetime import datetime
 
 # Get Redis URL from environment, or construct it with fallback defaults
@@ -111,8 +114,9 @@ def onboard_new_client_task(client_id):
 @shared_task(name="fetch_all_clients_orders_task")
 def fetch_all_clients_orders_task():
     """
-    Periodic task that fetches orders for all currently logged-in clients.
-    Runs every minute via Celery Beat.
+    Periodic task that fetches orders for the logged-in clients that are due.
+    Runs every minute via Celery Beat; each store's next poll time comes from
+    its recent order activity (see tasks/poll_scheduler.py).
     """
     db = SessionLocal()
     try:
@@ -128,9 +132,10 @@ def fetch_all_clients_orders_task():
             print("⚠️ No active clients. Skipping periodic sync.")
             return
 
-        print(f"🔄 Periodic sync: Found {len(clients)} active clients")
+        due_clients = get_due_clients(db, clients)
+        print(f"🔄 Periodic sync: {len(due_clients)} of {len(clients)} active clients due")
 
-        for client in clients:
+        for client in due_clients:
             try:
                 # Trigger full fetch only if never synced before
                 is_first_sync = client.last_synced_at is None
@@ -155,7 +160,8 @@ def fetch_all_clients_orders_task():
 def fetch_all_clients_products_task():
     """
     Periodic task that fetches products for all currently logged-in clients.
-    Runs every 2 hours via Celery Beat.
+    Runs every 15 minutes via Celery Beat; each run is incremental (only
+    products modified since the client's last product sync).
     """
     db = SessionLocal()
     try:
@@ -226,7 +232,10 @@ def send_dead_customers_messages():
     results = []
 
     try:
-        dead_customers = function_get_dead_customers(db)
+        client_ids = [c.id for c in db.query(Client.id).filter(Client.is_active == True).order_by(Client.id)]
+        dead_customers = [
+            customer for client_id in client_ids for customer in function_get_dead_customers(db, client_id)
+        ]
         for customer in dead_customers:
             phone = customer.get("phone")
             if not phone:
@@ -263,15 +272,30 @@ celery.conf.beat_schedule = {
         }
     },
 
-    # 🛒 Fetch WooCommerce products for active clients every 2 hours
-    "fetch-products-for-active-clients-every-2-hours": {
+    # 📲 Deliver queued order-status WhatsApp notifications
+    "send-order-notifications-every-1-min": {
+        "task": "send_order_notifications_task",
+        "schedule": crontab(minute="*"),
+        "options": {
+            "expires": 50,
+        }
+    },
+
+    # 🛒 Fetch changed WooCommerce products for active clients every 15 minutes
+    "fetch-products-for-active-clients-every-15-minutes": {
         "task": "fetch_all_clients_products_task",
-        "schedule": crontab(minute=0, hour="*/2"),
+        "schedule": crontab(minute="*/15"),
         "options": {
-            "expires": 3500,  # expires ~1 hour
+            "expires": 840,  # expires before the next run
         }
     },
 
+    # 👥 Recompute customer metrics, classification and segments nightly
+    "refresh-customer-metrics-nightly": {
+        "task": "refresh_customer_metrics_task",
+        "schedule": crontab(hour=2, minute=0),
+    },
+
     # 📲 Send WhatsApp messages daily at 10 AM (if re-enabled)
     # "send-whatsapp-daily": {
     #     "task": "send_whatsapp_broadcast",
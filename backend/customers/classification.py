@@ -0,0 +1,207 @@
+"""
+Vectorized customer classification.
+File: customers/classification.py
+
+Column-wise equivalents of classify_behavior, calculate_churn_risk and
+classify_spending in customers/operation_helper.py. They label a whole
+DataFrame with np.select / pd.cut instead of calling the scalar helpers row by
+row, and produce the same labels.
+
+Segmentation is a KMeans model over order count and recency, fitted per
+client by fit_segment_model and stored by tasks/customer_metrics.py. Clusters
+are named after the order-count / recency quadrant their centroid sits in, so
+a name means the same kind of customer after every refit, and assign_segments
+only does a nearest-centroid lookup. fit_segment_model_streaming refines the
+same model with MiniBatchKMeans over chunks, for tenants too large to load at
+once.
+"""
+
+from datetime import datetime
+from itertools import permutations
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+BEHAVIOR_CUTOFF_DATE = datetime(2025, 1, 1)
+# Recency used for customers without orders when clustering
+NO_ORDER_RECENCY_DAYS = 999
+
+SEGMENT_FEATURES = ["order_count", "recency_days"]
+# Segment name -> where its centroid should sit in scaled (order_count, recency_days) space
+SEGMENT_PROTOTYPES = {
+    "Loyal At-Risk": (1.0, -1.0),
+    "Dormant Customers": (1.0, 1.0),
+    "Cold Leads": (-1.0, -1.0),
+    "Lost One-Timers": (-1.0, 1.0),
+}
+SEGMENT_CLUSTERS = len(SEGMENT_PROTOTYPES)
+# Passes over the customers made by fit_segment_model_streaming
+STREAMING_EPOCHS = 3
+UNSEGMENTED = "Unsegmented"
+
+SPENDING_BINS = [-np.inf, 50, 200, 1000, np.inf]
+SPENDING_LABELS = ["Low Spender", "Medium Spender", "High Spender", "VIP"]
+
+
+def classify_behavior_column(order_count: pd.Series, last_order_date: pd.Series,
+                             cutoff_date: datetime = BEHAVIOR_CUTOFF_DATE) -> np.ndarray:
+    """'New', 'Dead', 'Occasional', 'Frequent', 'Loyal' or 'No Orders' per customer."""
+    # NaT compares False, like the scalar pd.notnull check
+    one_order = order_count == 1
+    return np.select(
+        [
+            one_order & (last_order_date < cutoff_date),
+            one_order,
+            order_count.between(2, 5),
+            order_count.between(6, 15),
+            order_count >= 16,
+        ],
+        ["Dead", "New", "Occasional", "Frequent", "Loyal"],
+        default="No Orders",
+    )
+
+
+def days_since_column(last_order_date: pd.Series, today: datetime) -> pd.Series:
+    """Whole days since the last order (like timedelta.days); NaN without orders."""
+    return (today - last_order_date).dt.days
+
+
+def calculate_churn_risk_column(last_order_date: pd.Series, today: datetime) -> np.ndarray:
+    """'Low', 'Medium' or 'High' churn risk per customer."""
+    days_since = days_since_column(last_order_date, today)
+    return np.select(
+        [days_since < 30, days_since < 90],
+        ["Low", "Medium"],
+        default="High",  # also customers without orders (NaN)
+    )
+
+
+def classify_spending_column(total_spent: pd.Series) -> np.ndarray:
+    """'Low Spender', 'Medium Spender', 'High Spender' or 'VIP' per customer."""
+    return pd.cut(total_spent, bins=SPENDING_BINS, labels=SPENDING_LABELS, right=False).astype(object).to_numpy()
+
+
+def classify_customers(df: pd.DataFrame, today: datetime) -> pd.DataFrame:
+    """
+    Add classification, churn_risk, spending_classification and recency_days
+    columns to a frame of customer aggregates (order_count, total_spent,
+    last_order_date).
+    """
+    df["classification"] = classify_behavior_column(df["order_count"], df["last_order_date"])
+    df["churn_risk"] = calculate_churn_risk_column(df["last_order_date"], today)
+    df["spending_classification"] = classify_spending_column(df["total_spent"])
+    df["recency_days"] = days_since_column(df["last_order_date"], today).fillna(NO_ORDER_RECENCY_DAYS)
+    return df
+
+
+def name_segments(centroids: np.ndarray) -> list[str]:
+    """
+    Segment name per scaled centroid: the pairing of centroids and
+    SEGMENT_PROTOTYPES with the smallest total distance.
+    """
+    names = list(SEGMENT_PROTOTYPES)
+    prototypes = np.array(list(SEGMENT_PROTOTYPES.values()))
+    best = min(
+        permutations(range(len(names))),
+        key=lambda order: np.linalg.norm(centroids - prototypes[list(order)], axis=1).sum(),
+    )
+    return [names[i] for i in best]
+
+
+def _previous_centroids(previous: dict, scaler: StandardScaler) -> np.ndarray:
+    """A stored model's centroids in the scale of a new fit, to start KMeans from."""
+    centroids = np.asarray(previous["centroids"]) * previous["feature_scales"] + previous["feature_means"]
+    return (centroids - scaler.mean_) / scaler.scale_
+
+
+def fit_segment_model(df: pd.DataFrame, previous: dict | None = None) -> dict | None:
+    """
+    Fit the scaler and KMeans on the customers with orders of a classified
+    frame (see classify_customers). None when there are too few of them to
+    form every cluster. With a `previous` model, KMeans starts from its
+    centroids, so clusters move with the data instead of being re-drawn.
+    """
+    features = df.loc[df["order_count"] > 0, SEGMENT_FEATURES]
+    if len(features) < SEGMENT_CLUSTERS:
+        return None
+
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(features)
+    if previous is None:
+        # Several starts: a single k-means++ start often stops in a clearly
+        # worse clustering, which every later warm-started refit would inherit
+        kmeans = KMeans(n_clusters=SEGMENT_CLUSTERS, random_state=42, n_init=10)
+    else:
+        kmeans = KMeans(n_clusters=SEGMENT_CLUSTERS, init=_previous_centroids(previous, scaler), n_init=1, random_state=42)
+    kmeans.fit(X_scaled)
+
+    return {
+        "feature_means": scaler.mean_.tolist(),
+        "feature_scales": scaler.scale_.tolist(),
+        "centroids": kmeans.cluster_centers_.tolist(),
+        "segments": name_segments(kmeans.cluster_centers_),
+        "customer_count": len(features),
+    }
+
+
+def fit_segment_model_streaming(chunks, previous: dict | None = None, epochs: int = STREAMING_EPOCHS) -> dict | None:
+    """
+    fit_segment_model for customers read in chunks: StandardScaler.partial_fit
+    over one pass, then MiniBatchKMeans.partial_fit over `epochs` more, so
+    memory is bounded by the chunk size rather than the customer count.
+
+    MiniBatchKMeans always starts from a batch model: `previous` when there
+    is one, otherwise (a client's first run) fit_segment_model over the
+    SEGMENT_FEATURES collected during the scaler pass. Those two columns are
+    all that is held for the whole client. A cold MiniBatchKMeans start can
+    settle in a different, equally good clustering and rename most customers'
+    segments.
+
+    `chunks` is called once per pass and must yield frames with the
+    SEGMENT_FEATURES of the customers with orders, in batches of at least
+    SEGMENT_CLUSTERS rows.
+    """
+    scaler = StandardScaler()
+    customer_count = 0
+    seed_features = [] if previous is None else None
+    for chunk in chunks():
+        if len(chunk):
+            scaler.partial_fit(chunk[SEGMENT_FEATURES])
+            customer_count += len(chunk)
+            if seed_features is not None:
+                seed_features.append(chunk[SEGMENT_FEATURES].to_numpy(dtype=float))
+    if customer_count < SEGMENT_CLUSTERS:
+        return None
+
+    if previous is None:
+        previous = fit_segment_model(pd.DataFrame(np.concatenate(seed_features), columns=SEGMENT_FEATURES))
+        seed_features = None
+    kmeans = MiniBatchKMeans(n_clusters=SEGMENT_CLUSTERS, init=_previous_centroids(previous, scaler), n_init=1, random_state=42)
+    for _ in range(epochs):
+        for chunk in chunks():
+            if len(chunk):
+                kmeans.partial_fit(scaler.transform(chunk[SEGMENT_FEATURES]))
+
+    return {
+        "feature_means": scaler.mean_.tolist(),
+        "feature_scales": scaler.scale_.tolist(),
+        "centroids": kmeans.cluster_centers_.tolist(),
+        "segments": name_segments(kmeans.cluster_centers_),
+        "customer_count": customer_count,
+    }
+
+
+def assign_segments(df: pd.DataFrame, model: dict | None) -> np.ndarray:
+    """Nearest-centroid segment per customer; 'Unsegmented' without orders or without a model."""
+    segments = np.full(len(df), UNSEGMENTED, dtype=object)
+    if model is None:
+        return segments
+
+    with_orders = (df["order_count"] > 0).to_numpy()
+    X = (df.loc[with_orders, SEGMENT_FEATURES].to_numpy(dtype=float) - model["feature_means"]) / model["feature_scales"]
+    centroids = np.asarray(model["centroids"])
+    nearest = ((X[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    segments[with_orders] = np.asarray(model["segments"], dtype=object)[nearest]
+    return segments
@@ -1,55 +1,104 @@
 from sqlalchemy.orm import Session
 from models import *
 from typing import List, Dict
-from sqlalchemy import func, desc, text, and_, case
+from sqlalchemy import func, desc, text, and_, or_, tuple_
 from datetime import date, timedelta, datetime
 from sqlalchemy.orm import Session, joinedload
 
-def customers_table_data(db: Session, client_id) -> List[dict]:
-    results = (
+# Sort keys of the customers table; ties are broken by customer ID
+CUSTOMERS_TABLE_SORTS = {
+    "spending": CustomerMetrics.total_spending,
+    "orders": CustomerMetrics.total_orders,
+    "name": CustomerMetrics.customer_name,
+}
+
+def _customers_table_query(db: Session, client_id):
+    """Customers of the client with at least one order, from customer_metrics."""
+    return (
         db.query(
-            Customer.id,
-            Customer.first_name,
-            Customer.last_name,
+            CustomerMetrics.customer_id,
+            CustomerMetrics.customer_name,
             Customer.phone,
-            func.count(Order.id).label("total_orders"),
-            func.coalesce(
-                func.sum(
-                    case(
-                        (Order.status.in_(["completed", "wc-completed"]), Order.total_amount),
-                        else_=0
-                    )
-                ),
-                0
-            ).label("total_spending")
+            CustomerMetrics.total_orders,
+            CustomerMetrics.total_spending,
+        )
+        .join(Customer, Customer.id == CustomerMetrics.customer_id)
+        .filter(
+            CustomerMetrics.client_id == client_id,
+            CustomerMetrics.total_orders > 0,
+            Customer.client_id == client_id,  # ✅ Only customers of this client
         )
-        .join(Order, Order.customer_id == Customer.id)
-        .filter(Customer.client_id == client_id)  # ✅ Only customers of this client
-        .group_by(Customer.id)
-        .order_by(desc("total_spending"))
-        .all()
     )
 
-    return [
-        {
-            "id": row.id,
-            "user": f"{row.first_name or ''} {row.last_name or ''}".strip() or "Unknown",
-            "phone": row.phone or "-",
-            "total_orders": int(row.total_orders or 0),
-            "total_spending": round(float(row.total_spending or 0), 2),
-        }
-        for row in results
-    ]
+def customers_table_row(row) -> dict:
+    return {
+        "id": row.customer_id,
+        "user": row.customer_name,
+        "phone": row.phone or "-",
+        "total_orders": int(row.total_orders or 0),
+        "total_spending": round(float(row.total_spending or 0), 2),
+    }
+
+def customers_table_page_data(db: Session, client_id, sort: str = "spending", descending: bool = True,
+                              limit: int = 50, after: tuple = None, search: str = None,
+                              min_orders: int = None, max_orders: int = None,
+                              min_spending: float = None, max_spending: float = None):
+    """
+    One page of the customers table, at most `limit` rows. `after` is the
+    (sort value, customer_id) of the last row of the previous page; the page
+    continues from there through the matching index instead of an OFFSET.
+    The order and spending bounds are inclusive; None leaves a bound open.
+    """
+    key = CUSTOMERS_TABLE_SORTS[sort]
+    query = _customers_table_query(db, client_id)
+
+    if search:
+        escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+        query = query.filter(or_(
+            CustomerMetrics.customer_name.ilike(pattern, escape="\\"),
+            Customer.phone.ilike(pattern, escape="\\"),
+        ))
+    if min_orders is not None:
+        query = query.filter(CustomerMetrics.total_orders >= min_orders)
+    if max_orders is not None:
+        query = query.filter(CustomerMetrics.total_orders <= max_orders)
+    if min_spending is not None:
+        query = query.filter(CustomerMetrics.total_spending >= min_spending)
+    if max_spending is not None:
+        query = query.filter(CustomerMetrics.total_spending <= max_spending)
+
+    position = tuple_(key, CustomerMetrics.customer_id)
+    if after is not None:
+        query = query.filter(position < tuple_(*after) if descending else position > tuple_(*after))
+
+    if descending:
+        query = query.order_by(key.desc(), CustomerMetrics.customer_id.desc())
+    else:
+        query = query.order_by(key.asc(), CustomerMetrics.customer_id.asc())
+    return query.limit(limit).all()
 
 def get_customer_order_data_for_analysis(db: Session, id: int) -> dict:
     customer = db.query(Customer).options(
         joinedload(Customer.address),
-        joinedload(Customer.orders).joinedload(Order.items).joinedload(OrderItem.product)
+        joinedload(Customer.orders).joinedload(Order.items)
     ).filter(Customer.id == id).first()
 
     if not customer:
         return {}
 
+    # Products are keyed by (client_id, external_id): resolve the items' products in one query
+    product_ids = {item.product_id for order in customer.orders for item in order.items if item.product_id}
+    products = {}
+    if product_ids:
+        products = {
+            product.external_id: product
+            for product in db.query(Product).filter(
+                Product.client_id == customer.client_id,
+                Product.external_id.in_(product_ids),
+            )
+        }
+
     # Build customer base info (no repetition)
     customer_info = {
         "customer_id": customer.id,
@@ -74,7 +123,7 @@ def get_customer_order_data_for_analysis(db: Session, id: int) -> dict:
         items_list = []
 
         for item in order.items:
-            product = item.product
+            product = products.get(item.product_id)
             item_record = {
                 "product_id": item.product_id,
                 "product_name": item.product_name,
@@ -185,35 +234,25 @@ def get_spending_customer_classification_data(db: Session):
     )
     return data
 
-def get_full_customer_classification_data(db: Session, client_id: int):
+def get_customer_metrics_data(db: Session, client_id: int, segment: str = None,
+                              classification: str = None, churn_risk: str = None):
     """
-    Fetches customer classification data for a specific client.
-    Includes:
-    - customer_id
-    - customer_name
-    - phone
-    - order_count
-    - total_spent
-    - last_order_date
-    Filters only 'completed' and 'processing' orders.
+    Persisted customer metrics (see tasks/customer_metrics.py) of one client
+    with the customer's phone, optionally filtered by label.
     """
-    data = (
+    query = (
         db.query(
-            Customer.id.label("customer_id"),
-            func.concat(Customer.first_name, ' ', Customer.last_name).label("customer_name"),
-            Customer.phone.label("phone"),
-            func.count(Order.id).label("order_count"),
-            func.coalesce(func.sum(Order.total_amount), 0).label("total_spent"),
-            func.max(Order.created_at).label("last_order_date")
-        )
-        .outerjoin(
-            Order,
-            (Customer.id == Order.customer_id) &
-            Order.status.in_(["completed", "processing"])
+            CustomerMetrics,
+            Customer.phone,
         )
-        .filter(Customer.client_id == client_id)  # ✅ Only current client’s customers
-        .group_by(Customer.id, Customer.first_name, Customer.last_name, Customer.phone)
-        .all()
+        .join(Customer, Customer.id == CustomerMetrics.customer_id)
+        .filter(CustomerMetrics.client_id == client_id, Customer.client_id == client_id)
     )
+    if segment:
+        query = query.filter(CustomerMetrics.segment == segment)
+    if classification:
+        query = query.filter(CustomerMetrics.classification == classification)
+    if churn_risk:
+        query = query.filter(CustomerMetrics.churn_risk == churn_risk)
 
-    return data
\ No newline at end of file
+    return query.order_by(CustomerMetrics.customer_id).all()
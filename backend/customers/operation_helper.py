@@ -1,13 +1,54 @@
 from customers.db_helper import *
+import base64
+import json
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
 import numpy as np
+from tasks.customer_metrics import rebuild_customer_metrics, customer_metrics_built
+
+def ensure_customer_metrics(db, client_id):
+    # Clients never rebuilt yet (synced before customer_metrics existed, or only
+    # ingested since) get every customer and a segmentation model computed once
+    # here; afterwards ingestion and the nightly refresh keep it current
+    if not customer_metrics_built(db, client_id):
+        rebuild_customer_metrics(db, client_id)
+        db.commit()
+
+def encode_customers_cursor(sort, order, row) -> str:
+    """Opaque cursor pointing after `row` in the customers table sorted by `sort` and `order`."""
+    value = {"spending": row.total_spending, "orders": row.total_orders, "name": row.customer_name}[sort]
+    payload = json.dumps([sort, order, value, row.customer_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+def decode_customers_cursor(cursor, sort, order) -> tuple:
+    """(sort value, customer_id) from encode_customers_cursor; ValueError if it is not one for this sort."""
+    try:
+        cursor_sort, cursor_order, value, customer_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise ValueError("Cursor belongs to a different sort order")
+    return value, customer_id
+
+def function_get_customers_table(db, client_id, sort="spending", order="desc", limit=50, cursor=None, search=None,
+                                 min_orders=None, max_orders=None, min_spending=None, max_spending=None):
+    """
+    One page of the customers table and the cursor of the next one (None on
+    the last page). Every page costs the same, however deep it is.
+    """
+    ensure_customer_metrics(db, client_id)
+    after = decode_customers_cursor(cursor, sort, order) if cursor else None
 
-def function_get_customers_table(db, client_id):
-    customers_data = customers_table_data(db, client_id)
+    # One extra row tells whether another page follows
+    rows = customers_table_page_data(
+        db, client_id, sort=sort, descending=order == "desc", limit=limit + 1, after=after, search=search,
+        min_orders=min_orders, max_orders=max_orders, min_spending=min_spending, max_spending=max_spending,
+    )
+    next_cursor = encode_customers_cursor(sort, order, rows[limit - 1]) if len(rows) > limit else None
 
-    return customers_data
+    return {
+        "items": [customers_table_row(row) for row in rows[:limit]],
+        "next_cursor": next_cursor,
+    }
 
 def function_get_customers_details(db, id: int):
     data = get_customer_order_data_for_analysis(db, id)
@@ -147,110 +188,52 @@ def classify_spending(total_spent):
     else:
         return "VIP"
 
-def segment_customers_kmeans(df, today):
-    
-    """
-    Apply KMeans clustering based on order count and recency.
-
-    Args:
-        df (DataFrame): DataFrame with 'order_count' and 'last_order_date'.
-        today (datetime): Reference date to calculate recency.
-
-    Returns:
-        DataFrame: Modified DataFrame with a 'segment' column.
-    """
-
-    df["recency_days"] = df["last_order_date"].apply(
-        lambda d: (today - d).days if pd.notnull(d) else 999
-    )
-    clustering_df = df[df["order_count"] > 0][["order_count", "recency_days"]]
-
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(clustering_df)
-
-    kmeans = KMeans(n_clusters=4, random_state=42, n_init="auto")
-    df.loc[df["order_count"] > 0, "segment"] = kmeans.fit_predict(X_scaled).astype(int)
-
-    segment_map = {
-        0: "Loyal At-Risk",
-        1: "Dormant Customers",
-        2: "Cold Leads",
-        3: "Lost One-Timers"
-    }
-    df["segment"] = df["segment"].apply(lambda x: segment_map.get(x, "Unsegmented"))
-    return df
-
 # --------------------------
 # Main Function
 # --------------------------
 
-def function_get_full_customer_classification(db, client_id):
-    # Fetch data
-    customer_data = get_full_customer_classification_data(db, client_id)
-    
-    # SAFELY convert query result to DataFrame using column labels
-    df = pd.DataFrame([dict(row._mapping) for row in customer_data])
-    
-    # Clean data
-    df["order_count"] = df["order_count"].fillna(0).astype(int)
-    df["total_spent"] = df["total_spent"].fillna(0).astype(float)
-    df["last_order_date"] = pd.to_datetime(df["last_order_date"], errors='coerce')
-
-    today = datetime.now()
-
-    # Apply classifications
-    df["classification"] = df.apply(
-        lambda row: classify_behavior(row["order_count"], row["last_order_date"]), axis=1
-    )
-    df["churn_risk"] = df["last_order_date"].apply(lambda x: calculate_churn_risk(x, today))
-    df["spending_classification"] = df["total_spent"].apply(classify_spending)
-
-    # Apply segmentation
-    df = segment_customers_kmeans(df, today)
-
-    # Format date
-    df["last_order_date"] = df["last_order_date"].apply(
-        lambda x: x.isoformat() if pd.notnull(x) else None
-    )
-
-    # Optional inspection
-    print(df.groupby("segment")[["order_count", "recency_days", "total_spent"]].mean())
-
-    # Final return structure
+def customer_metrics_records(rows) -> list:
+    """Classification response rows for get_customer_metrics_data results."""
     return [
         {
-            "customer_id": int(row["customer_id"]),
-            "customer_name": str(row["customer_name"]),
-            "phone": row["phone"],
-            "order_count": int(row["order_count"]),
-            "total_spent": float(row["total_spent"]),
-            "last_order_date": row["last_order_date"],
-            "classification": row["classification"],
-            "churn_risk": row["churn_risk"],
-            "segment": row["segment"],
-            "spending_classification": row["spending_classification"]
+            "customer_id": metrics.customer_id,
+            "customer_name": metrics.customer_name,
+            "phone": phone,
+            "order_count": metrics.order_count,
+            "total_spent": metrics.total_spent,
+            "last_order_date": metrics.last_order_date.isoformat() if metrics.last_order_date else None,
+            "classification": metrics.classification,
+            "churn_risk": metrics.churn_risk,
+            "segment": metrics.segment,
+            "spending_classification": metrics.spending_classification,
         }
-        for _, row in df.iterrows()
+        for metrics, phone in rows
     ]
 
-def function_get_customers_with_low_churnRisk(db):
+def function_get_full_customer_classification(db, client_id, segment=None):
+    ensure_customer_metrics(db, client_id)
 
-    all_customers = function_get_full_customer_classification(db)
-    low_churn_customers = [c for c in all_customers if c["churn_risk"] == "Low"]
-    
-    return low_churn_customers
+    rows = get_customer_metrics_data(db, client_id, segment=segment)
+    return customer_metrics_records(rows)
 
-def function_get_dead_customers(db):
+def function_get_customers_with_low_churnRisk(db, client_id):
+    ensure_customer_metrics(db, client_id)
+
+    rows = get_customer_metrics_data(db, client_id, churn_risk="Low")
+    return customer_metrics_records(rows)
+
+def function_get_dead_customers(db, client_id):
     """
     Extract customers classified as 'Dead'.
 
     Args:
         db: Database connection/session.
+        client_id: Client whose customers are returned.
 
     Returns:
         list: Customers with classification = 'Dead'.
     """
-    all_customers = function_get_full_customer_classification(db)
-    dead_customers = [c for c in all_customers if c["classification"] == "Dead"]
-    
-    return dead_customers
\ No newline at end of file
+    ensure_customer_metrics(db, client_id)
+
+    rows = get_customer_metrics_data(db, client_id, classification="Dead")
+    return customer_metrics_records(rows)
@@ -8,6 +8,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from routers import orders
 from routers import products
 from routers import customers
+from routers import webhooks
 
 load_dotenv()
 
@@ -47,6 +48,7 @@ app.include_router(auth.router)
 app.include_router(orders.router)
 app.include_router(products.router)
 app.include_router(customers.router)
+app.include_router(webhooks.router)
 # app.include_router(ai_chat.router)
 # app.include_router(whatsapp_messaging.router)
 # app.include_router(forecast_api.router)
@@ -1,4 +1,4 @@
-from sqlalchemy import ( Column, Integer, BigInteger, String, Float, ForeignKey, DateTime, Index, Text, Boolean)
+from sqlalchemy import ( Column, Integer, BigInteger, String, Float, ForeignKey, Date, DateTime, Index, Text, Boolean, UniqueConstraint, text)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from cryptography.fernet import Fernet
@@ -35,6 +35,7 @@ class Client(Base):
     store_url = Column(String, nullable=True)
     _consumer_key = Column("consumer_key", String, nullable=True)
     _consumer_secret = Column("consumer_secret", String, nullable=True)
+    _webhook_secret = Column("webhook_secret", String, nullable=True)
 
     user_type = Column(String, default="client")
     is_active = Column(Boolean, default=True)
@@ -82,6 +83,21 @@ class Client(Base):
         else:
             self._consumer_secret = None
 
+    @property
+    def webhook_secret(self):
+        """Return decrypted WooCommerce webhook secret"""
+        if self._webhook_secret:
+            return fernet.decrypt(self._webhook_secret.encode()).decode()
+        return None
+
+    @webhook_secret.setter
+    def webhook_secret(self, value):
+        """Encrypt and store WooCommerce webhook secret"""
+        if value:
+            self._webhook_secret = fernet.encrypt(value.encode()).decode()
+        else:
+            self._webhook_secret = None
+
 class Customer(Base):
     __tablename__ = "customers"
 
@@ -91,7 +107,7 @@ class Customer(Base):
     email = Column(String, index=True, nullable=True)
     phone = Column(String, unique=True, index=True)
     # 🔗 Reference back to client
-    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False, index=True)
     client = relationship("Client", back_populates="customers")
     orders = relationship("Order", back_populates="customer", cascade="all, delete-orphan")
     address = relationship("Address", back_populates="customer", uselist=False, cascade="all, delete-orphan")
@@ -101,7 +117,7 @@ class Address(Base):
     __tablename__ = "addresses"
 
     id = Column(Integer, primary_key=True, index=True)
-    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), nullable=False, index=True)
     company = Column(String)
     address_1 = Column(String)
     address_2 = Column(String)
@@ -117,10 +133,15 @@ class Order(Base):
     id = Column(Integer, primary_key=True, index=True)  # internal DB id
     external_id = Column(BigInteger, unique=True, index=True, nullable=True)  # WooCommerce ID (previously `order_id`)
     order_key = Column(String, unique=True, index=True, nullable=False)
-    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="SET NULL"))
+    # Denormalized from the customer so dashboards filter orders without joining customers.
+    # NULL only for orders stored before it existed whose store could not be derived
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=True)
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="SET NULL"), index=True)
     status = Column(String, nullable=False)
     total_amount = Column(Float, nullable=False)
     created_at = Column(DateTime, index=True, nullable=False)
+    # WooCommerce date_modified_gmt of the stored copy; older payloads are dropped
+    modified_at = Column(DateTime, nullable=True)
     payment_method = Column(String, nullable=True)
     attribution_referrer = Column(String, nullable=True)
     session_pages = Column(Integer, nullable=True)
@@ -129,11 +150,28 @@ class Order(Base):
     customer = relationship("Customer", back_populates="orders", passive_deletes=True)
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_orders_client_id_status_created_at", "client_id", "status", "created_at"),
+        # Covers the per-day sales sums without visiting the heap
+        Index(
+            "ix_orders_client_id_created_at", "client_id", "created_at",
+            postgresql_include=["status", "total_amount"],
+        ),
+        # Most dashboards only look at completed orders
+        Index(
+            "ix_orders_completed_client_id_created_at", "client_id", "created_at",
+            postgresql_include=["status", "total_amount", "customer_id"],
+            postgresql_where=text("status IN ('completed', 'wc-completed')"),
+        ),
+    )
+
 class Product(Base):
     __tablename__ = "products"
 
     id = Column(Integer, primary_key=True, index=True)
-    external_id = Column(BigInteger, unique=True, index=True, nullable=True)
+    # WooCommerce product IDs are only unique within a store
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+    external_id = Column(BigInteger, nullable=True)
     name = Column(String, nullable=False)
     short_description = Column(Text, nullable=True)
     regular_price = Column(Float, nullable=True)
@@ -145,28 +183,141 @@ class Product(Base):
     date_created = Column(DateTime, nullable=True)
     date_modified = Column(DateTime, nullable=True)
 
-    # ✅ Relationship back to OrderItem
-    order_items = relationship("OrderItem", back_populates="product")
+    __table_args__ = (
+        UniqueConstraint("client_id", "external_id", name="uq_products_client_id_external_id"),
+    )
 
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"))
-    product_id = Column(Integer, ForeignKey("products.external_id", ondelete="SET NULL"))  # ✅ This is essential
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), index=True)
+    # Copied from the order, so NULL exactly when the order's client_id is
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=True)
+    # WooCommerce product ID; matches Product.external_id within the order's client
+    product_id = Column(Integer, nullable=True)
     product_name = Column(String, nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
     order = relationship("Order", back_populates="items", passive_deletes=True)
-    
-    # ✅ Relationship to Product
-    product = relationship("Product", back_populates="order_items")
+
+    __table_args__ = (
+        Index("ix_order_items_client_id_product_id", "client_id", "product_id"),
+        # Top-selling products group by name
+        Index(
+            "ix_order_items_client_id_product_name", "client_id", "product_name",
+            postgresql_include=["order_id", "quantity"],
+        ),
+    )
+
+class DailySalesRollup(Base):
+    """Orders per client, day and status, kept up to date by order ingestion (tasks/sales_rollup.py)."""
+    __tablename__ = "daily_sales_rollup"
+
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    status = Column(String, primary_key=True)
+    order_count = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0.0, nullable=False)
+    item_quantity = Column(Integer, default=0, nullable=False)
+
+class ProductDailySalesRollup(Base):
+    """Line items per client, day, order status and product, kept up to date by order ingestion (tasks/sales_rollup.py)."""
+    __tablename__ = "product_daily_sales_rollup"
+
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    status = Column(String, primary_key=True)
+    # WooCommerce product ID as stored on the order items, 0 when the product is unknown
+    product_id = Column(Integer, primary_key=True)
+    product_name = Column(String, primary_key=True)
+    quantity = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0.0, nullable=False)
+
+    __table_args__ = (
+        Index("ix_product_daily_sales_rollup_client_id_product_id_day", "client_id", "product_id", "day"),
+    )
+
+class CustomerMetrics(Base):
+    """Per-customer order aggregates and classification labels (tasks/customer_metrics.py)."""
+    __tablename__ = "customer_metrics"
+
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+    # Completed and processing orders only, like the classification has always counted them
+    order_count = Column(Integer, default=0, nullable=False)
+    total_spent = Column(Float, default=0.0, nullable=False)
+    first_order_date = Column(DateTime, nullable=True)
+    last_order_date = Column(DateTime, nullable=True)
+    classification = Column(String, nullable=False)
+    churn_risk = Column(String, nullable=False)
+    spending_classification = Column(String, nullable=False)
+    segment = Column(String, default="Unsegmented", nullable=False)
+    # Customers table columns: every order counts, only completed ones add to spending
+    customer_name = Column(String, default="Unknown", nullable=False)
+    total_orders = Column(Integer, default=0, nullable=False)
+    total_spending = Column(Float, default=0.0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_customer_metrics_client_id_classification", "client_id", "classification"),
+        Index("ix_customer_metrics_client_id_churn_risk", "client_id", "churn_risk"),
+        Index("ix_customer_metrics_client_id_segment", "client_id", "segment"),
+        # Keyset pagination of the customers table, one per sort; it only lists customers with orders
+        Index(
+            "ix_customer_metrics_table_spending", "client_id", "total_spending", "customer_id",
+            postgresql_where=text("total_orders > 0"),
+        ),
+        Index(
+            "ix_customer_metrics_table_orders", "client_id", "total_orders", "customer_id",
+            postgresql_where=text("total_orders > 0"),
+        ),
+        Index(
+            "ix_customer_metrics_table_name", "client_id", "customer_name", "customer_id",
+            postgresql_where=text("total_orders > 0"),
+        ),
+    )
+
+class CustomerSegmentModel(Base):
+    """Per-client KMeans segmentation model, retrained by the nightly customer metrics refresh."""
+    __tablename__ = "customer_segment_models"
+
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    # JSON lists: StandardScaler mean_/scale_ per feature, scaled centroids, segment name per centroid
+    feature_means = Column(Text, nullable=False)
+    feature_scales = Column(Text, nullable=False)
+    centroids = Column(Text, nullable=False)
+    segments = Column(Text, nullable=False)
+    customer_count = Column(Integer, default=0, nullable=False)
+    trained_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 class SyncState(Base):
     __tablename__ = "sync_state"
     key = Column(String, primary_key=True)
     value = Column(String)
 
+class OrderNotification(Base):
+    """Outbox of order-status WhatsApp notifications, drained by send_order_notifications_task."""
+    __tablename__ = "order_notifications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=True)
+    phone = Column(String, nullable=False)
+    customer_name = Column(String, nullable=True)
+    order_number = Column(String, nullable=False)
+    order_status = Column(String, nullable=False)
+    template_name = Column(String, nullable=False)
+    status = Column(String, default="PENDING", nullable=False)  # PENDING, SENT, FAILED
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_order_notifications_status_id", "status", "id"),
+    )
+
 class WhatsAppMessage(Base):
     __tablename__ = "whatsapp_messages"
 
@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from models import *
 from typing import List, Dict
 from sqlalchemy import func, extract, cast, Date, desc, text, distinct
@@ -8,8 +8,8 @@ from collections import Counter
 def get_latest_orders_data(db: Session, client_id: int) -> List[dict]:
     orders = (
         db.query(Order)
-        .join(Customer, Order.customer_id == Customer.id)
-        .filter(Customer.client_id == client_id)
+        .options(joinedload(Order.customer))
+        .filter(Order.client_id == client_id)
         .order_by(Order.created_at.desc())
         .limit(5)
         .all()
@@ -28,14 +28,12 @@ def get_latest_orders_data(db: Session, client_id: int) -> List[dict]:
 
 def get_total_orders_count_data(db: Session, client_id: int) -> List[dict]:
     """
-    Count all orders belonging to a specific client using ORM relationships.
+    Count all orders belonging to a specific client.
     """
-    # Count orders where customer's client_id matches
     total_orders = (
-        db.query(Order)
-        .join(Order.customer)          # Use the relationship
-        .filter(Customer.client_id == client_id)
-        .count()
+        db.query(func.count(Order.id))
+        .filter(Order.client_id == client_id)
+        .scalar()
     )
 
     return [
@@ -47,10 +45,9 @@ def get_total_orders_count_data(db: Session, client_id: int) -> List[dict]:
 
 def get_total_sales_data(db: Session, client_id: int) -> List[dict]:
     total_sales = (
-        db.query(func.coalesce(func.sum(Order.total_amount), 0.0))
-        .join(Customer, Order.customer_id == Customer.id)
-        .filter(Customer.client_id == client_id)
-        .filter(Order.status.in_(["completed"]))  # Include both statuses
+        db.query(func.coalesce(func.sum(DailySalesRollup.revenue), 0.0))
+        .filter(DailySalesRollup.client_id == client_id)
+        .filter(DailySalesRollup.status.in_(["completed"]))  # Include both statuses
         .scalar()
     )
 
@@ -64,11 +61,11 @@ def get_total_sales_data(db: Session, client_id: int) -> List[dict]:
 def get_average_order_value_data(db: Session, client_id: int) -> List[dict]:
     result = (
         db.query(
-            func.coalesce(func.sum(Order.total_amount), 0.0).label("total_sales"),
-            func.count(Order.id).label("completed_order_count")
+            func.coalesce(func.sum(DailySalesRollup.revenue), 0.0).label("total_sales"),
+            func.coalesce(func.sum(DailySalesRollup.order_count), 0).label("completed_order_count")
         )
-        .filter(Order.customer.has(client_id=client_id))
-        .filter(Order.status == "completed")
+        .filter(DailySalesRollup.client_id == client_id)
+        .filter(DailySalesRollup.status == "completed")
         .first()
     )
 
@@ -102,7 +99,7 @@ def get_top_customers_data(db: Session, client_id: int) -> List[dict]:
             func.coalesce(func.sum(Order.total_amount), 0).label("total_spending")
         )
         .join(Order, Order.customer_id == Customer.id)
-        .filter(Customer.client_id == client_id)
+        .filter(Customer.client_id == client_id, Order.client_id == client_id)
         .filter(Order.status == "completed")
         .group_by(Customer.id)
         .order_by(desc("total_spending"))
@@ -132,42 +129,40 @@ def get_sales_comparison_data(db: Session, client_id: int) -> dict:
 
     # Current month sales per day for this client
     current_month_query = text("""
-        SELECT EXTRACT(DAY FROM o.created_at) AS day, SUM(o.total_amount) AS total
-        FROM orders o
-        JOIN customers c ON o.customer_id = c.id
+        SELECT EXTRACT(DAY FROM r.day) AS day, SUM(r.revenue) AS total
+        FROM daily_sales_rollup r
         WHERE 
-            c.client_id = :client_id AND
-            EXTRACT(MONTH FROM o.created_at) = :month AND
-            EXTRACT(YEAR FROM o.created_at) = :year AND
-            o.created_at <= :today AND
-            o.status NOT IN ('failed', 'cancelled')
-        GROUP BY day
-        ORDER BY day
+            r.client_id = :client_id AND
+            r.day >= :month_start AND
+            r.day <= :today AND
+            r.status NOT IN ('failed', 'cancelled')
+        GROUP BY r.day
+        HAVING SUM(r.order_count) > 0
+        ORDER BY r.day
     """)
     current_sales = db.execute(current_month_query, {
         "client_id": client_id,
-        "month": current_month,
-        "year": current_year,
+        "month_start": first_day_current,
         "today": today
     }).fetchall()
 
     # Previous month sales per day for this client
     prev_month_query = text("""
-        SELECT EXTRACT(DAY FROM o.created_at) AS day, SUM(o.total_amount) AS total
-        FROM orders o
-        JOIN customers c ON o.customer_id = c.id
+        SELECT EXTRACT(DAY FROM r.day) AS day, SUM(r.revenue) AS total
+        FROM daily_sales_rollup r
         WHERE 
-            c.client_id = :client_id AND
-            EXTRACT(MONTH FROM o.created_at) = :month AND
-            EXTRACT(YEAR FROM o.created_at) = :year AND
-            o.status NOT IN ('failed', 'cancelled')
-        GROUP BY day
-        ORDER BY day
+            r.client_id = :client_id AND
+            r.day >= :month_start AND
+            r.day < :month_end AND
+            r.status NOT IN ('failed', 'cancelled')
+        GROUP BY r.day
+        HAVING SUM(r.order_count) > 0
+        ORDER BY r.day
     """)
     prev_sales = db.execute(prev_month_query, {
         "client_id": client_id,
-        "month": prev_month,
-        "year": prev_year
+        "month_start": date(prev_year, prev_month, 1),
+        "month_end": first_day_current
     }).fetchall()
 
     return {
@@ -177,59 +172,43 @@ def get_sales_comparison_data(db: Session, client_id: int) -> dict:
 
 def get_orders_in_range_data(db: Session, start_date: str, end_date: str, granularity: str = "daily", client_id: int = None):
     """
-    Get total order amount grouped by date/month/year for a specific client.
+    Get total order amount grouped by date/month/year for a specific client,
+    summed from the daily sales rollup. Both ends of the range are inclusive days.
     """
     if not client_id:
         return []  # Safety
 
     base_query = (
-        db.query(Order)
-        .join(Customer, Customer.id == Order.customer_id)
+        db.query(DailySalesRollup)
         .filter(
-            Customer.client_id == client_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date,
-            Order.status.in_(["completed", "wc-completed"])
+            DailySalesRollup.client_id == client_id,
+            DailySalesRollup.day >= start_date,
+            DailySalesRollup.day <= end_date,
+            DailySalesRollup.status.in_(["completed", "wc-completed"])
         )
     )
 
     # 👇 Grouping logic by granularity
     if granularity == "daily":
-        query = (
-            base_query.with_entities(
-                func.date(Order.created_at).label("date"),
-                func.sum(Order.total_amount).label("total_amount"),
-                func.count(Order.id).label("order_count"),
-            )
-            .group_by(func.date(Order.created_at))
-            .order_by(func.date(Order.created_at))
-        )
-
+        period = DailySalesRollup.day
     elif granularity == "monthly":
-        query = (
-            base_query.with_entities(
-                func.to_char(Order.created_at, "YYYY-MM").label("date"),
-                func.sum(Order.total_amount).label("total_amount"),
-                func.count(Order.id).label("order_count"),
-            )
-            .group_by(func.to_char(Order.created_at, "YYYY-MM"))
-            .order_by(func.to_char(Order.created_at, "YYYY-MM"))
-        )
-
+        period = func.to_char(DailySalesRollup.day, "YYYY-MM")
     elif granularity == "yearly":
-        query = (
-            base_query.with_entities(
-                func.to_char(Order.created_at, "YYYY").label("date"),
-                func.sum(Order.total_amount).label("total_amount"),
-                func.count(Order.id).label("order_count"),
-            )
-            .group_by(func.to_char(Order.created_at, "YYYY"))
-            .order_by(func.to_char(Order.created_at, "YYYY"))
-        )
-
+        period = func.to_char(DailySalesRollup.day, "YYYY")
     else:
         raise ValueError("Invalid granularity. Use 'daily', 'monthly', or 'yearly'.")
 
+    query = (
+        base_query.with_entities(
+            period.label("date"),
+            func.sum(DailySalesRollup.revenue).label("total_amount"),
+            func.sum(DailySalesRollup.order_count).label("order_count"),
+        )
+        .group_by(period)
+        .having(func.sum(DailySalesRollup.order_count) > 0)
+        .order_by(period)
+    )
+
     results = query.all()
 
     return [
@@ -244,12 +223,11 @@ def get_orders_in_range_data(db: Session, start_date: str, end_date: str, granul
 def get_orders_data(db: Session, client_id: int) -> List[dict]:
     """
     Fetch all orders for a specific client.
-    Joins Order → Customer and filters by client_id.
     """
     orders = (
         db.query(Order)
-        .join(Order.customer)  # ✅ Join to the Customer table
-        .filter(Customer.client_id == client_id)  # ✅ Only this client's orders
+        .options(joinedload(Order.customer))
+        .filter(Order.client_id == client_id)
         .order_by(Order.created_at.desc())
         .all()
     )
@@ -272,12 +250,10 @@ def get_orders_data(db: Session, client_id: int) -> List[dict]:
 def get_attribution_summary(db: Session, client_id: int) -> List[dict]:
     """
     Fetch attribution summary for a specific client.
-    Joins Orders → Customers to filter by client.
     """
     results = (
         db.query(Order.attribution_referrer, func.count(Order.id))
-        .join(Order.customer)  # ✅ Join Orders to Customers
-        .filter(Customer.client_id == client_id)  # ✅ Filter by client's ID
+        .filter(Order.client_id == client_id)
         .group_by(Order.attribution_referrer)
         .all()
     )
@@ -10,19 +10,18 @@ def get_top_selling_products_data(db: Session, client_id: int) -> list[dict]:
     """
     Returns the top 5 selling products (by quantity sold) for a given client.
     This version does NOT depend on Product.external_id since many order_items
-    have no product_id value.
+    have no product_id value. Served from the per-product daily sales rollup.
     """
     results = (
         db.query(
-            OrderItem.product_name.label("name"),
-            func.sum(OrderItem.quantity).label("total_quantity_sold")
+            ProductDailySalesRollup.product_name.label("name"),
+            func.sum(ProductDailySalesRollup.quantity).label("total_quantity_sold")
         )
-        .join(Order, Order.id == OrderItem.order_id)
-        .join(Customer, Customer.id == Order.customer_id)
-        .filter(Customer.client_id == client_id)
-        .filter(Order.status.in_(["completed", "wc-completed"]))
-        .group_by(OrderItem.product_name)
-        .order_by(func.sum(OrderItem.quantity).desc())
+        .filter(ProductDailySalesRollup.client_id == client_id)
+        .filter(ProductDailySalesRollup.status.in_(["completed", "wc-completed"]))
+        .group_by(ProductDailySalesRollup.product_name)
+        .having(func.sum(ProductDailySalesRollup.quantity) > 0)
+        .order_by(func.sum(ProductDailySalesRollup.quantity).desc())
         .limit(5)
         .all()
     )
@@ -40,22 +39,22 @@ def get_top_selling_products_inbetween_data(
 ) -> list[dict]:
     """
     Returns the top 5 selling products (by quantity sold) for a given client
-    within a specific date range, based on OrderItem data.
-    Does not rely on Product.external_id since many order_items may lack product_id.
+    within a specific date range (inclusive days), from the per-product daily
+    sales rollup. Does not rely on Product.external_id since many order_items
+    may lack product_id.
     """
     results = (
         db.query(
-            OrderItem.product_name.label("name"),
-            func.sum(OrderItem.quantity).label("total_quantity_sold")
+            ProductDailySalesRollup.product_name.label("name"),
+            func.sum(ProductDailySalesRollup.quantity).label("total_quantity_sold")
         )
-        .join(Order, Order.id == OrderItem.order_id)
-        .join(Customer, Customer.id == Order.customer_id)
-        .filter(Customer.client_id == client_id)
-        .filter(Order.status.in_(["completed", "wc-completed"]))
-        .filter(Order.created_at >= start_date)
-        .filter(Order.created_at <= end_date)
-        .group_by(OrderItem.product_name)
-        .order_by(func.sum(OrderItem.quantity).desc())
+        .filter(ProductDailySalesRollup.client_id == client_id)
+        .filter(ProductDailySalesRollup.status.in_(["completed", "wc-completed"]))
+        .filter(ProductDailySalesRollup.day >= start_date)
+        .filter(ProductDailySalesRollup.day <= end_date)
+        .group_by(ProductDailySalesRollup.product_name)
+        .having(func.sum(ProductDailySalesRollup.quantity) > 0)
+        .order_by(func.sum(ProductDailySalesRollup.quantity).desc())
         .limit(5)
         .all()
     )
@@ -67,11 +66,24 @@ def get_top_selling_products_inbetween_data(
 
 def get_products_sales_table_data(db: Session, client_id: int, start_date: str, end_date: str):
     try:
-        start = datetime.fromisoformat(start_date)
-        end = datetime.fromisoformat(end_date) + timedelta(days=1) - timedelta(seconds=1)
+        start = datetime.fromisoformat(start_date).date()
+        end = datetime.fromisoformat(end_date).date()
     except (ValueError, TypeError):
         return []
 
+    sales = (
+        db.query(
+            ProductDailySalesRollup.product_name.label("product_name"),
+            func.sum(ProductDailySalesRollup.quantity).label("total_sales")
+        )
+        .filter(ProductDailySalesRollup.client_id == client_id)
+        .filter(ProductDailySalesRollup.status.in_(["completed", "wc-completed"]))
+        .filter(ProductDailySalesRollup.day >= start)
+        .filter(ProductDailySalesRollup.day <= end)
+        .group_by(ProductDailySalesRollup.product_name)
+        .subquery()
+    )
+
     results = (
         db.query(
             Product.id,
@@ -79,23 +91,12 @@ def get_products_sales_table_data(db: Session, client_id: int, start_date: str,
             Product.categories,
             Product.sales_price,
             Product.regular_price,
-            func.sum(OrderItem.quantity).label("total_sales")
-        )
-        .join(OrderItem, Product.name == OrderItem.product_name)
-        .join(Order, Order.id == OrderItem.order_id)
-        .join(Customer, Customer.id == Order.customer_id)
-        .filter(Customer.client_id == client_id)
-        .filter(Order.status.in_(["completed", "wc-completed"]))
-        .filter(Order.created_at >= start)
-        .filter(Order.created_at <= end)
-        .group_by(
-            Product.id,
-            Product.name,
-            Product.categories,
-            Product.sales_price,
-            Product.regular_price
+            sales.c.total_sales
         )
-        .order_by(func.sum(OrderItem.quantity).desc())
+        .join(sales, sales.c.product_name == Product.name)
+        .filter(Product.client_id == client_id)
+        .filter(sales.c.total_sales > 0)
+        .order_by(sales.c.total_sales.desc())
         .all()
     )
 
@@ -128,19 +129,19 @@ def get_products_sales_table_data(db: Session, client_id: int, start_date: str,
         for p_id, name, category, sales_price, regular_price, total_sales in results
     ]
 
-def get_products_table_data(db: Session):
+def get_products_table_data(db: Session, client_id: int):
 
-    products = db.query(Product).all()
+    products = db.query(Product).filter(Product.client_id == client_id).all()
     return [ProductSchema.from_orm(p) for p in products]
 
-def get_product_details_data(db: Session, id: int) -> dict:
+def get_product_details_data(db: Session, id: int, client_id: int) -> dict:
     
-    return db.query(Product).filter(Product.id == id).all() 
+    return db.query(Product).filter(Product.id == id, Product.client_id == client_id).all() 
 
-def get_sales_over_time_data(db: Session, start_date: str, end_date: str, product_id: int):
+def get_sales_over_time_data(db: Session, client_id: int, start_date: str, end_date: str, product_id: int):
     try:
-        start = datetime.fromisoformat(start_date)
-        end = datetime.fromisoformat(end_date)
+        start = datetime.fromisoformat(start_date).date()
+        end = datetime.fromisoformat(end_date).date()
     except ValueError:
         return []
 
@@ -148,17 +149,22 @@ def get_sales_over_time_data(db: Session, start_date: str, end_date: str, produc
         db.query(
             Product.name.label("product_name"),
             Product.external_id.label("external_id"),
-            cast(Order.created_at, Date).label("date"),
-            func.sum(OrderItem.quantity).label("total_sales")
+            ProductDailySalesRollup.day.label("date"),
+            func.sum(ProductDailySalesRollup.quantity).label("total_sales")
+        )
+        .join(
+            ProductDailySalesRollup,
+            (ProductDailySalesRollup.client_id == Product.client_id) &
+            (ProductDailySalesRollup.product_id == Product.external_id)
         )
-        .join(OrderItem, Product.external_id == OrderItem.product_id)
-        .join(Order, Order.id == OrderItem.order_id)
-        .filter(Order.created_at >= start)
-        .filter(Order.created_at <= end)
-        .filter(Order.status == "completed")
+        .filter(Product.client_id == client_id)
+        .filter(ProductDailySalesRollup.day >= start)
+        .filter(ProductDailySalesRollup.day <= end)
+        .filter(ProductDailySalesRollup.status == "completed")
         .filter(Product.id == product_id)
-        .group_by(Product.name, Product.external_id, cast(Order.created_at, Date))
-        .order_by(cast(Order.created_at, Date))
+        .group_by(Product.name, Product.external_id, ProductDailySalesRollup.day)
+        .having(func.sum(ProductDailySalesRollup.quantity) > 0)
+        .order_by(ProductDailySalesRollup.day)
         .all()
     )
 
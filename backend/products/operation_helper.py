@@ -20,20 +20,20 @@ def function_get_products_sales_table(db, client_id, start_date, end_date):
    
     return products_sales_table_response
 
-def function_get_products_table(db):
+def function_get_products_table(db, client_id):
 
-    products_table_response = get_products_table_data(db)
+    products_table_response = get_products_table_data(db, client_id)
 
     return products_table_response
 
-def function_get_product_details(db, id: int):
+def function_get_product_details(db, id: int, client_id):
 
-    sales_comparison_data = get_product_details_data(db, id)
+    sales_comparison_data = get_product_details_data(db, id, client_id)
     return sales_comparison_data
 
-def function_get_sales_over_time(db, start_date, end_date, product_id):
+def function_get_sales_over_time(db, client_id, start_date, end_date, product_id):
 
-    sales_over_time_data = get_sales_over_time_data(db, start_date, end_date, product_id)
+    sales_over_time_data = get_sales_over_time_data(db, client_id, start_date, end_date, product_id)
 
     return sales_over_time_data
 
@@ -6,7 +6,7 @@ from models import Client, Base
 from utils.auth import get_current_client, hash_password, create_access_token, verify_password
 from typing import Optional
 from schemas import LoginRequest, RegisterRequest
-from tasks.fetch_orders import fetch_orders_task
+from tasks.fetch_orders import fetch_orders_task, get_full_sync_progress, get_last_sync_stats
 from datetime import datetime
 from celery.result import AsyncResult
 from celery.exceptions import OperationalError
@@ -115,10 +115,17 @@ def get_sync_status(email: str, db: Session = Depends(get_db)):
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
 
+    sync_complete = client.sync_status == "COMPLETE"
+    progress = get_full_sync_progress(db, client.id)
+
     return {
         "sync_status": client.sync_status,
-        "sync_complete": client.sync_status == "COMPLETE",
-        "last_synced_at": client.last_synced_at
+        "sync_complete": sync_complete,
+        "last_synced_at": client.last_synced_at,
+        "pages_done": progress["pages_done"] if progress else None,
+        "total_pages": progress["total_pages"] if progress else None,
+        "progress_percent": 100.0 if sync_complete else (progress["percent"] if progress else 0.0),
+        "last_sync_stats": get_last_sync_stats(db, client.id),
     }
 
 @router.post("/login")
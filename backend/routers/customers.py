@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Literal
 from database import get_db
 from models import *  # Assuming Customer model is imported
 from customers.operation_helper import *
@@ -9,10 +9,27 @@ from utils.auth import get_current_client
 
 router = APIRouter()
 
-@router.get("/customers-table", response_model=List[dict])
-def get_customers_table(db: Session = Depends(get_db), current_client = Depends(get_current_client) ):
-
-    response_data = function_get_customers_table(db=db, client_id = current_client.id)
+@router.get("/customers-table", response_model=CustomersTablePage)
+def get_customers_table(
+    sort: Literal["spending", "orders", "name"] = "spending",
+    order: Literal["asc", "desc"] = "desc",
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
+    min_orders: Optional[int] = Query(None, ge=0),
+    max_orders: Optional[int] = Query(None, ge=0),
+    min_spending: Optional[float] = Query(None, ge=0),
+    max_spending: Optional[float] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+    current_client = Depends(get_current_client),
+):
+    try:
+        response_data = function_get_customers_table(
+            db=db, client_id=current_client.id, sort=sort, order=order, limit=limit, cursor=cursor, search=search,
+            min_orders=min_orders, max_orders=max_orders, min_spending=min_spending, max_spending=max_spending,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return response_data
 
 @router.get("/customer-details/{id}", response_model=CustomerDetailsResponse)
@@ -48,15 +65,15 @@ def get_customer_product_orders(customer_id: int, product_external_id: int, db:
 #     return response_data
     
 @router.get("/full-customer-classification", response_model=List[CustomerClassificationResponse])
-def get_full_customer_classification(db: Session = Depends(get_db), current_client = Depends(get_current_client)):
+def get_full_customer_classification(segment: Optional[str] = None, db: Session = Depends(get_db), current_client = Depends(get_current_client)):
 
-    response_data = function_get_full_customer_classification(db=db, client_id = current_client.id)
+    response_data = function_get_full_customer_classification(db=db, client_id = current_client.id, segment=segment)
     
     return response_data
 
 @router.get("/customers_with_low_churnRisk", response_model=List[CustomerClassificationResponse])
-def get_customers_with_low_churnRisk(db: Session = Depends(get_db)):
+def get_customers_with_low_churnRisk(db: Session = Depends(get_db), current_client = Depends(get_current_client)):
 
-    response_data = function_get_customers_with_low_churnRisk(db)
+    response_data = function_get_customers_with_low_churnRisk(db, client_id = current_client.id)
 
     return response_data
@@ -29,22 +29,22 @@ def get_products_sales_table(db:Session = Depends(get_db), current_client = Depe
     return response_data
 
 @router.get("/products-table", response_model=List[ProductSchema])
-def get_products_table(db:Session = Depends(get_db)):
+def get_products_table(db:Session = Depends(get_db), current_client = Depends(get_current_client)):
 
-    response_data = function_get_products_table(db)
+    response_data = function_get_products_table(db, current_client.id)
     
     return response_data
 
 @router.get("/product-details/{id}", response_model=List[ProductSchema])
-def get_product_details(id: int, db: Session = Depends(get_db)):
+def get_product_details(id: int, db: Session = Depends(get_db), current_client = Depends(get_current_client)):
 
-    response_data = function_get_product_details(db, id)
+    response_data = function_get_product_details(db, id, current_client.id)
     return response_data
 
 @router.get("/product-sales-over-time", response_model=List[Dict[str, Any]])
-def get_product_sales_over_time(start_date: str, end_date: str, product_id: int, db: Session = Depends(get_db)):
+def get_product_sales_over_time(start_date: str, end_date: str, product_id: int, db: Session = Depends(get_db), current_client = Depends(get_current_client)):
 
-    response_data = function_get_sales_over_time(db=db, product_id=product_id, start_date=start_date, end_date= end_date)
+    response_data = function_get_sales_over_time(db=db, client_id=current_client.id, product_id=product_id, start_date=start_date, end_date= end_date)
     return response_data
 
 # @router.get("/segment-products", response_model = List[dict])
@@ -0,0 +1,136 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from database import get_db
+from models import Client
+from utils.auth import get_current_client
+from utils.wc_client import get_wc_client, WooCommerceAPIError
+from tasks.fetch_orders import is_stale_order
+from tasks.order_webhooks import process_order_webhook_task
+
+router = APIRouter()
+
+# Public base URL of this API, used as the webhook delivery URL registered in the store
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "").rstrip("/")
+ORDER_WEBHOOK_TOPICS = ("order.created", "order.updated")
+
+def verify_webhook_signature(body: bytes, signature: str, secret: str) -> bool:
+    """WooCommerce signs the raw body with base64(HMAC-SHA256(secret, body))."""
+    expected = base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+    return hmac.compare_digest(expected, signature or "")
+
+def get_webhook_client(client_id: int, db: Session = Depends(get_db)) -> Client:
+    """The client a webhook is addressed to. A sync dependency, so FastAPI runs the lookup in its threadpool."""
+    client = db.query(Client).filter(Client.id == client_id).first()
+    if not client or not client.webhook_secret:
+        raise HTTPException(status_code=404, detail="Webhook not configured")
+    return client
+
+@router.post("/webhooks/woocommerce/{client_id}")
+async def receive_woocommerce_webhook(request: Request, client: Client = Depends(get_webhook_client),
+                                      db: Session = Depends(get_db)):
+    """
+    Receive order.created / order.updated webhooks from a client's store.
+
+    The signature is checked against the client's webhook secret and the order
+    is handed to process_order_webhook_task, so the request returns as soon as
+    the payload is queued. Payloads older than the stored order (retried or
+    reordered deliveries) are dropped here; the task checks again when writing.
+    Database work runs in the threadpool so it never blocks the event loop.
+    """
+    body = await request.body()
+    topic = request.headers.get("X-WC-Webhook-Topic")
+
+    # WooCommerce sends an unsigned "webhook_id=<id>" ping when a webhook is saved
+    if not topic and body.startswith(b"webhook_id="):
+        return {"status": "ok"}
+
+    if not verify_webhook_signature(body, request.headers.get("X-WC-Webhook-Signature"), client.webhook_secret):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    if topic not in ORDER_WEBHOOK_TOPICS:
+        return {"status": "ignored", "topic": topic}
+
+    try:
+        order = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    if not isinstance(order, dict) or not order.get("order_key"):
+        raise HTTPException(status_code=400, detail="Payload is not an order")
+
+    if await run_in_threadpool(is_stale_order, db, client.id, order):
+        return {"status": "stale"}
+
+    task = await run_in_threadpool(process_order_webhook_task.delay, client.id, order)
+    return {"status": "queued", "task_id": task.id}
+
+def register_order_webhooks(wc, delivery_url: str, secret: str) -> list[dict]:
+    """
+    Make the store deliver ORDER_WEBHOOK_TOPICS to `delivery_url` signed with
+    `secret`, exactly once per topic: a webhook already pointing at us is
+    updated in place (new secret, reactivated) and duplicates of it are
+    deleted; a new one is only created when the topic has none.
+    """
+    existing = {}
+    for _, webhooks, _ in wc.iter_pages("webhooks", {"per_page": 100, "orderby": "id", "order": "asc"}):
+        for webhook in webhooks:
+            if webhook.get("delivery_url") == delivery_url:
+                existing.setdefault(webhook.get("topic"), []).append(webhook["id"])
+
+    registered = []
+    for topic in ORDER_WEBHOOK_TOPICS:
+        payload = {
+            "name": f"WC Solutions {topic}",
+            "topic": topic,
+            "delivery_url": delivery_url,
+            "secret": secret,
+            "status": "active",
+        }
+        try:
+            webhook_ids = existing.get(topic, [])
+            if webhook_ids:
+                webhook = wc.put(f"webhooks/{webhook_ids[0]}", payload)
+                for duplicate_id in webhook_ids[1:]:
+                    wc.delete(f"webhooks/{duplicate_id}")
+            else:
+                webhook = wc.post("webhooks", payload)
+            registered.append({"topic": topic, "id": webhook.get("id")})
+        except WooCommerceAPIError as e:
+            print(f"⚠️ Could not register {topic} webhook at {delivery_url}: {e}")
+    return registered
+
+@router.post("/webhooks/setup")
+def setup_order_webhooks(rotate: bool = False, db: Session = Depends(get_db),
+                         current_client: Client = Depends(get_current_client)):
+    """
+    Create (or, with `rotate`, replace) the current client's webhook secret and,
+    when WEBHOOK_BASE_URL is configured, register the order webhooks in the
+    store. Calling it again updates the webhooks already registered for this
+    client instead of adding more, so a rotated secret replaces the old one.
+    """
+    secret = current_client.webhook_secret
+    if not secret or rotate:
+        secret = secrets.token_urlsafe(32)
+        current_client.webhook_secret = secret
+        db.commit()
+
+    delivery_url = f"{WEBHOOK_BASE_URL}/webhooks/woocommerce/{current_client.id}" if WEBHOOK_BASE_URL else None
+    registered = []
+    if delivery_url and current_client.store_url and current_client.consumer_key and current_client.consumer_secret:
+        wc = get_wc_client(current_client.store_url, current_client.consumer_key, current_client.consumer_secret)
+        try:
+            registered = register_order_webhooks(wc, delivery_url, secret)
+        except WooCommerceAPIError as e:
+            print(f"⚠️ Could not list webhooks for {current_client.email}: {e}")
+
+    return {
+        "secret": secret,
+        "delivery_url": delivery_url,
+        "registered": registered,
+    }
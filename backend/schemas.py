@@ -60,6 +60,18 @@ class CustomerClassificationResponse(BaseModel):
     segment: Optional[str]
 
 
+class CustomersTableRow(BaseModel):
+    id: int
+    user: str
+    phone: str
+    total_orders: int
+    total_spending: float
+
+class CustomersTablePage(BaseModel):
+    items: List[CustomersTableRow]
+    next_cursor: Optional[str]
+
+
 class ProductItem(BaseModel):
     product_id: Optional[int]
     product_name: Optional[str]
@@ -0,0 +1,356 @@
+"""
+Persisted customer metrics and classification labels.
+File: tasks/customer_metrics.py
+
+`customer_metrics` keeps each customer's order count, spend, first/last order
+date, classification, churn risk, spending class and KMeans segment, plus the
+customers table's name, order count and spending, so the classification
+endpoint, the customers table and the messaging selectors read one indexed
+table instead of aggregating orders and re-fitting KMeans on every call.
+
+refresh_customer_metrics_task recomputes every customer of a client nightly:
+it retrains the client's segmentation model, stores it in
+customer_segment_models and ages churn risk. Order ingestion refreshes the
+customers it touched with `refresh_customer_metrics`, which segments them with
+the stored model (nearest centroid, no fitting).
+
+Large clients (STREAMING_SEGMENTATION_MIN_CUSTOMERS and up) are rebuilt in
+streaming mode: customers are read in chunks through server-side cursors, the
+model is refined from the stored one with MiniBatchKMeans.partial_fit and
+segments are written back chunk by chunk, so the worker only holds a chunk at a
+time. A client's first streaming run has no stored model and seeds it with a
+batch fit over just the two segmentation features. To recompute and retrain by
+hand, optionally forcing a mode:
+
+    python -m tasks.customer_metrics [--batch | --streaming] [client_id ...]
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+from celery import shared_task
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from customers.classification import (
+    classify_customers, fit_segment_model, fit_segment_model_streaming, assign_segments,
+    NO_ORDER_RECENCY_DAYS,
+)
+from database import SessionLocal
+from models import Client, Customer, CustomerMetrics, CustomerSegmentModel, Order, SyncState
+
+# Orders the classification counts
+CLASSIFIED_ORDER_STATUSES = ["completed", "processing"]
+# Orders the customers table adds to a customer's spending
+SPENDING_ORDER_STATUSES = ["completed", "wc-completed"]
+METRICS_UPSERT_BATCH_SIZE = 5000
+
+SEGMENTATION_MODES = ("batch", "streaming")
+# Clients with this many customers are rebuilt in streaming mode unless a mode is given
+STREAMING_SEGMENTATION_MIN_CUSTOMERS = int(os.getenv("STREAMING_SEGMENTATION_MIN_CUSTOMERS", 200000))
+STREAMING_CHUNK_SIZE = 10000
+
+AGGREGATE_COLUMNS = [
+    "customer_id", "order_count", "total_spent", "first_order_date", "last_order_date",
+    "customer_name", "total_orders", "total_spending",
+]
+
+
+def _customer_aggregates_query(db: Session, client_id: int, customer_ids: list[int] | None = None):
+    classified = Order.status.in_(CLASSIFIED_ORDER_STATUSES)
+    query = (
+        db.query(
+            Customer.id.label("customer_id"),
+            func.count(Order.id).filter(classified).label("order_count"),
+            func.coalesce(func.sum(Order.total_amount).filter(classified), 0).label("total_spent"),
+            func.min(Order.created_at).filter(classified).label("first_order_date"),
+            func.max(Order.created_at).filter(classified).label("last_order_date"),
+            func.coalesce(
+                func.nullif(func.trim(func.concat_ws(" ", Customer.first_name, Customer.last_name)), ""),
+                "Unknown",
+            ).label("customer_name"),
+            func.count(Order.id).label("total_orders"),
+            func.coalesce(
+                func.sum(Order.total_amount).filter(Order.status.in_(SPENDING_ORDER_STATUSES)), 0
+            ).label("total_spending"),
+        )
+        .outerjoin(
+            Order,
+            (Order.customer_id == Customer.id) &
+            (Order.client_id == client_id)
+        )
+        .filter(Customer.client_id == client_id)
+        .group_by(Customer.id)
+    )
+    if customer_ids is not None:
+        query = query.filter(Customer.id.in_(customer_ids))
+    return query
+
+
+def _aggregates_frame(rows) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=AGGREGATE_COLUMNS)
+    df["order_count"] = df["order_count"].fillna(0).astype(int)
+    df["total_spent"] = df["total_spent"].fillna(0).astype(float)
+    df["first_order_date"] = pd.to_datetime(df["first_order_date"], errors="coerce")
+    df["last_order_date"] = pd.to_datetime(df["last_order_date"], errors="coerce")
+    df["total_orders"] = df["total_orders"].fillna(0).astype(int)
+    df["total_spending"] = df["total_spending"].fillna(0).astype(float)
+    return df
+
+
+def customer_aggregates(db: Session, client_id: int, customer_ids: list[int] | None = None) -> pd.DataFrame:
+    """Order aggregates per customer of the client (all of them when `customer_ids` is None)."""
+    return _aggregates_frame(_customer_aggregates_query(db, client_id, customer_ids).all())
+
+
+def _stream_rows(db: Session, query, chunk_size: int):
+    """Result rows of an ORM query in lists of `chunk_size`, through a server-side cursor."""
+    result = db.execute(query.statement, execution_options={"yield_per": chunk_size})
+    yield from result.partitions()
+
+
+def _datetimes(values: pd.Series) -> list:
+    """Python datetimes for the DB driver, None for NaT."""
+    return [None if pd.isna(value) else value.to_pydatetime() for value in values]
+
+
+def _metrics_rows(df: pd.DataFrame, client_id: int) -> list[dict]:
+    now = datetime.utcnow()
+    columns = {
+        "customer_id": df["customer_id"].astype(int).tolist(),
+        "order_count": df["order_count"].tolist(),
+        "total_spent": df["total_spent"].tolist(),
+        "first_order_date": _datetimes(df["first_order_date"]),
+        "last_order_date": _datetimes(df["last_order_date"]),
+        "classification": df["classification"].tolist(),
+        "churn_risk": df["churn_risk"].tolist(),
+        "spending_classification": df["spending_classification"].tolist(),
+        "segment": df["segment"].tolist(),
+        "customer_name": df["customer_name"].tolist(),
+        "total_orders": df["total_orders"].tolist(),
+        "total_spending": df["total_spending"].tolist(),
+    }
+    keys = list(columns)
+    return [
+        {"client_id": client_id, "updated_at": now, **dict(zip(keys, values))}
+        for values in zip(*columns.values())
+    ]
+
+
+def _upsert_metrics(db: Session, rows: list[dict]) -> None:
+    updated = [
+        "order_count", "total_spent", "first_order_date", "last_order_date",
+        "classification", "churn_risk", "spending_classification", "segment",
+        "customer_name", "total_orders", "total_spending", "updated_at",
+    ]
+
+    # On the Table rather than the entity: the ORM bulk path splits rows into one
+    # statement per pattern of NULL columns
+    stmt = pg_insert(CustomerMetrics.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CustomerMetrics.customer_id],
+        set_={column: stmt.excluded[column] for column in updated},
+    )
+    # executemany: compiled once and sent as multi-row VALUES pages by the driver,
+    # instead of compiling a statement with tens of thousands of parameters
+    for start in range(0, len(rows), METRICS_UPSERT_BATCH_SIZE):
+        db.execute(stmt, rows[start:start + METRICS_UPSERT_BATCH_SIZE])
+
+
+def load_segment_model(db: Session, client_id: int) -> dict | None:
+    """The client's stored segmentation model, in the form fit_segment_model returns."""
+    row = db.query(CustomerSegmentModel).filter(CustomerSegmentModel.client_id == client_id).first()
+    if not row:
+        return None
+    return {
+        "feature_means": json.loads(row.feature_means),
+        "feature_scales": json.loads(row.feature_scales),
+        "centroids": json.loads(row.centroids),
+        "segments": json.loads(row.segments),
+        "customer_count": row.customer_count,
+    }
+
+
+def save_segment_model(db: Session, client_id: int, model: dict | None) -> None:
+    """Replace the client's stored model; None removes it (too few customers to segment)."""
+    db.query(CustomerSegmentModel).filter(CustomerSegmentModel.client_id == client_id).delete()
+    if model is not None:
+        db.add(CustomerSegmentModel(
+            client_id=client_id,
+            feature_means=json.dumps(model["feature_means"]),
+            feature_scales=json.dumps(model["feature_scales"]),
+            centroids=json.dumps(model["centroids"]),
+            segments=json.dumps(model["segments"]),
+            customer_count=model["customer_count"],
+            trained_at=datetime.utcnow(),
+        ))
+        db.flush()
+
+
+def metrics_built_key(client_id: int) -> str:
+    return f"customer_metrics_built_client_{client_id}"
+
+
+def customer_metrics_built(db: Session, client_id: int) -> bool:
+    """
+    Whether every customer of the client has been rebuilt at least once.
+    Ingestion upserts rows for the customers it touches, so rows existing
+    does not mean the rest of the client (or its model) has been computed.
+    """
+    return db.query(SyncState.key).filter_by(key=metrics_built_key(client_id)).first() is not None
+
+
+def _mark_metrics_built(db: Session, client_id: int) -> None:
+    built_at = datetime.utcnow().isoformat() + "Z"
+    state = db.query(SyncState).filter_by(key=metrics_built_key(client_id)).first()
+    if state:
+        state.value = built_at
+    else:
+        db.add(SyncState(key=metrics_built_key(client_id), value=built_at))
+
+
+def refresh_customer_metrics(db: Session, client_id: int, customer_ids) -> int:
+    """
+    Recompute the metrics of the given customers, e.g. after ingesting their
+    orders, segmenting them with the client's stored model ("Unsegmented"
+    until one has been trained). Committing is left to the caller.
+    """
+    customer_ids = sorted(set(customer_ids))
+    if not customer_ids:
+        return 0
+
+    df = customer_aggregates(db, client_id, customer_ids)
+    if df.empty:
+        return 0
+    df = classify_customers(df, datetime.now())
+    df["segment"] = assign_segments(df, load_segment_model(db, client_id))
+    _upsert_metrics(db, _metrics_rows(df, client_id))
+    return len(df)
+
+
+def rebuild_customer_metrics(db: Session, client_id: int) -> int:
+    """
+    Recompute metrics and labels for every customer of the client, retraining
+    and storing its segmentation model. Committing is left to the caller.
+    """
+    df = customer_aggregates(db, client_id)
+    if df.empty:
+        return 0
+
+    df = classify_customers(df, datetime.now())
+    model = fit_segment_model(df, previous=load_segment_model(db, client_id))
+    save_segment_model(db, client_id, model)
+    df["segment"] = assign_segments(df, model)
+    _upsert_metrics(db, _metrics_rows(df, client_id))
+    _mark_metrics_built(db, client_id)
+    return len(df)
+
+
+def _segment_features(db: Session, client_id: int, today: datetime, chunk_size: int):
+    """SEGMENT_FEATURES of the client's customers with orders, from customer_metrics, in chunks."""
+    query = (
+        db.query(CustomerMetrics.customer_id, CustomerMetrics.order_count, CustomerMetrics.last_order_date)
+        .filter(CustomerMetrics.client_id == client_id, CustomerMetrics.order_count > 0)
+    )
+    for rows in _stream_rows(db, query, chunk_size):
+        df = pd.DataFrame(rows, columns=["customer_id", "order_count", "last_order_date"])
+        last_order_date = pd.to_datetime(df["last_order_date"], errors="coerce")
+        df["recency_days"] = (today - last_order_date).dt.days.fillna(NO_ORDER_RECENCY_DAYS)
+        yield df
+
+
+def _update_segments(db: Session, customer_ids: list[int], segments: list[str]) -> None:
+    db.execute(
+        text("""
+            UPDATE customer_metrics m SET segment = s.segment
+            FROM unnest(CAST(:customer_ids AS integer[]), CAST(:segments AS varchar[])) AS s(customer_id, segment)
+            WHERE m.customer_id = s.customer_id
+        """),
+        {"customer_ids": customer_ids, "segments": segments},
+    )
+
+
+def rebuild_customer_metrics_streaming(db: Session, client_id: int, chunk_size: int = STREAMING_CHUNK_SIZE) -> int:
+    """
+    rebuild_customer_metrics for clients too large to hold in memory: metrics
+    are computed and upserted chunk by chunk, the model is fitted with
+    fit_segment_model_streaming over customer_metrics, and segments are
+    written back in bulk per chunk. Committing is left to the caller.
+    """
+    today = datetime.now()
+    previous = load_segment_model(db, client_id)
+
+    refreshed = 0
+    for rows in _stream_rows(db, _customer_aggregates_query(db, client_id), chunk_size):
+        df = classify_customers(_aggregates_frame(rows), today)
+        # Segmented by the current model for now, replaced below
+        df["segment"] = assign_segments(df, previous)
+        _upsert_metrics(db, _metrics_rows(df, client_id))
+        refreshed += len(df)
+    if not refreshed:
+        return 0
+
+    model = fit_segment_model_streaming(
+        lambda: _segment_features(db, client_id, today, chunk_size), previous=previous
+    )
+    save_segment_model(db, client_id, model)
+    for df in _segment_features(db, client_id, today, chunk_size):
+        _update_segments(db, df["customer_id"].astype(int).tolist(), assign_segments(df, model).tolist())
+    _mark_metrics_built(db, client_id)
+    return refreshed
+
+
+def segmentation_mode(db: Session, client_id: int, mode: str = None) -> str:
+    """`mode` when given, otherwise "streaming" for clients with STREAMING_SEGMENTATION_MIN_CUSTOMERS customers."""
+    if mode:
+        if mode not in SEGMENTATION_MODES:
+            raise ValueError(f"Unknown segmentation mode: {mode}")
+        return mode
+    customer_count = db.query(func.count(Customer.id)).filter(Customer.client_id == client_id).scalar()
+    return "streaming" if customer_count >= STREAMING_SEGMENTATION_MIN_CUSTOMERS else "batch"
+
+
+@shared_task(name="refresh_customer_metrics_task")
+def refresh_customer_metrics_task(client_id: int = None, mode: str = None):
+    """
+    Full recompute of customer metrics for one client, or for every active
+    client when `client_id` is None. `mode` ("batch" or "streaming") forces
+    the segmentation mode; by default it follows the client's size.
+    """
+    db = SessionLocal()
+    refreshed = {}
+    try:
+        if client_id:
+            client_ids = [client_id]
+        else:
+            client_ids = [c.id for c in db.query(Client.id).filter(Client.is_active == True).order_by(Client.id)]
+
+        for cid in client_ids:
+            try:
+                if segmentation_mode(db, cid, mode) == "streaming":
+                    refreshed[cid] = rebuild_customer_metrics_streaming(db, cid)
+                else:
+                    refreshed[cid] = rebuild_customer_metrics(db, cid)
+                db.commit()
+                print(f"👥 Refreshed metrics for {refreshed[cid]} customers of client {cid}")
+            except Exception as e:
+                db.rollback()
+                print(f"❌ Customer metrics refresh failed for client {cid}: {e}")
+    finally:
+        db.close()
+    return refreshed
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    cli_mode = next((arg[2:] for arg in args if arg in ("--batch", "--streaming")), None)
+    client_ids = [int(arg) for arg in args if not arg.startswith("--")]
+    if client_ids:
+        for cid in client_ids:
+            refresh_customer_metrics_task(cid, mode=cli_mode)
+    else:
+        refresh_customer_metrics_task(mode=cli_mode)
@@ -1,9 +1,12 @@
 import httpx
+import json
 import os
+from sqlalchemy import insert, literal_column, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from models import Customer, Address, Order, OrderItem, Product, SyncState
-from tasks.send_whatsapp import send_whatsapp_template
-from datetime import datetime, timedelta
+from models import Customer, Address, Order, OrderItem, Product, SyncState, OrderNotification
+from tasks.order_notifications import send_order_notifications_task
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from dateutil.parser import isoparse
 import psycopg2
@@ -13,7 +16,13 @@ from celery import shared_task
 from models import Client
 from fastapi import Depends, HTTPException, Header
 from jose import jwt, JWTError
-from utils.redis_lock import acquire_sync_lock, release_sync_lock
+from utils.redis_lock import acquire_sync_lock, release_sync_lock, extend_sync_lock
+from utils.wc_client import get_wc_client, WooCommerceAPIError
+from utils.pipeline import run_streaming_stage, format_stage_stats
+from utils.identity_map import IdentityMap
+from tasks.poll_scheduler import record_order_poll
+from tasks.sales_rollup import SalesRollupDeltas
+from tasks.customer_metrics import refresh_customer_metrics
 
 load_dotenv()
 
@@ -97,144 +106,493 @@ def set_last_synced_time(db: Session, timestamp: str) -> None:
         db.add(SyncState(key="last_order_sync", value=timestamp))
     db.commit()
 
-def process_order_data(db: Session, data: dict, client_id: int) -> None:
-    email = data["billing"].get("email") or None
-    raw_phone = data["billing"].get("phone") or None
-    phone = normalize_phone(raw_phone)
+def get_sync_state(db: Session, key: str) -> str | None:
+    state = db.query(SyncState).filter_by(key=key).first()
+    return state.value if state else None
 
-    customer = None
-    if phone:
-        customer = db.query(Customer).filter_by(phone=phone).first()
-    if not customer and email:
-        customer = db.query(Customer).filter_by(email=email).first()
-
-    if not customer:
-        customer = Customer(
-            first_name=data["billing"].get("first_name", ""),
-            last_name=data["billing"].get("last_name", ""),
-            email=email,
-            phone=phone,
-            client_id=client_id,
-        )
-        db.add(customer)
+def set_sync_state(db: Session, key: str, value: str) -> None:
+    """Upsert a SyncState value; committing is left to the caller."""
+    state = db.query(SyncState).filter_by(key=key).first()
+    if state:
+        state.value = value
+    else:
+        db.add(SyncState(key=key, value=value))
+
+# Only the order fields ingestion reads (`_fields` projection): skips shipping,
+# tax and coupon lines, links and most of every line item
+ORDER_FIELDS = ",".join([
+    "id", "order_key", "status", "total", "payment_method_title",
+    "date_created", "date_created_gmt", "date_modified_gmt",
+    "billing", "meta_data",
+    "line_items.product_id", "line_items.name", "line_items.quantity", "line_items.price",
+])
+
+# Incremental syncs re-read this much history before the watermark so orders
+# modified within the same second as the last sync are not missed
+WATERMARK_OVERLAP = timedelta(seconds=int(os.getenv("ORDER_WATERMARK_OVERLAP_SECONDS", 60)))
+
+def parse_gmt(value: str) -> datetime:
+    """Parse a WooCommerce *_gmt value (or our own "...Z" timestamps) as naive UTC."""
+    parsed = isoparse(value)
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def max_modified_gmt(orders: list[dict], current: str | None = None) -> str | None:
+    """Highest date_modified_gmt among `orders` and `current`, as a WooCommerce GMT string."""
+    values = [parse_gmt(order["date_modified_gmt"]) for order in orders if order.get("date_modified_gmt")]
+    if current:
+        values.append(parse_gmt(current))
+    return max(values).strftime("%Y-%m-%dT%H:%M:%S") if values else None
+
+def latest_store_modified_gmt(wc) -> str | None:
+    """Most recent date_modified_gmt across the store's orders, read on the store's own clock."""
+    orders, _ = wc.get_page(
+        "orders", {"per_page": 1, "orderby": "modified", "order": "desc", "_fields": "date_modified_gmt"}, 1
+    )
+    return max_modified_gmt(orders)
+
+def get_full_sync_checkpoint(db: Session, client_id: int) -> dict | None:
+    """Progress of an unfinished full order sync, or None if there is none."""
+    value = get_sync_state(db, f"order_full_sync_client_{client_id}")
+    return json.loads(value) if value else None
+
+def set_full_sync_checkpoint(db: Session, client_id: int, checkpoint: dict) -> None:
+    set_sync_state(db, f"order_full_sync_client_{client_id}", json.dumps(checkpoint))
+
+def clear_full_sync_checkpoint(db: Session, client_id: int) -> None:
+    db.query(SyncState).filter_by(key=f"order_full_sync_client_{client_id}").delete()
+
+def get_full_sync_progress(db: Session, client_id: int) -> dict | None:
+    """Pages done / total pages of the running (or interrupted) full sync."""
+    checkpoint = get_full_sync_checkpoint(db, client_id)
+    if not checkpoint:
+        return None
+
+    total_pages = checkpoint.get("total_pages") or 0
+    pages_done = checkpoint.get("pages_done", 0)
+    return {
+        "pages_done": pages_done,
+        "total_pages": total_pages or None,
+        "percent": round(min(100.0, 100.0 * pages_done / total_pages), 1) if total_pages else 0.0,
+    }
+
+def order_modified_at(data: dict) -> datetime | None:
+    """The order's date_modified_gmt as naive UTC, None if the payload has none."""
+    value = data.get("date_modified_gmt")
+    return parse_gmt(value) if value else None
+
+def is_stale_order(db: Session, client_id: int, data: dict) -> bool:
+    """Whether the stored copy of the order was modified after `data` (e.g. a late webhook retry)."""
+    modified_at = order_modified_at(data)
+    if modified_at is None:
+        return False
+    stored = (
+        db.query(Order.modified_at)
+        .filter(Order.order_key == data["order_key"], Order.client_id == client_id)
+        .scalar()
+    )
+    return stored is not None and modified_at < stored
+
+def get_last_sync_stats(db: Session, client_id: int) -> dict | None:
+    """Counters and timings recorded by the client's last completed order sync."""
+    value = get_sync_state(db, f"last_order_sync_stats_client_{client_id}")
+    return json.loads(value) if value else None
+
+def _notification_row(customer: dict, order_id: int, data: dict, client_id: int) -> dict | None:
+    """Outbox row for an order-status WhatsApp message, or None if nothing should be sent."""
+    if not customer.get("phone"):
+        return None
+
+    template_name = WHATSAPP_TEMPLATES.get(data["status"])
+    if not template_name:
+        print(f"⚠️ No template configured for order status: {data['status']}")
+        return None
+
+    return {
+        "client_id": client_id,
+        "order_id": order_id,
+        "phone": customer["phone"],
+        "customer_name": f"{customer.get('first_name') or ''} {customer.get('last_name') or ''}".strip(),
+        "order_number": str(data["id"]),
+        "order_status": data["status"],
+        "template_name": template_name,
+        "status": "PENDING",
+        "attempts": 0,
+        "created_at": datetime.utcnow(),
+    }
+
+def _resolve_customers(db: Session, orders: list[dict], client_id: int,
+                       identity_map: IdentityMap | None = None) -> list[dict]:
+    """
+    Resolve (or create) the customer of every order in the page.
+
+    Existing customers are looked up with one IN (...) query per identity
+    (phone, then email). Missing ones are created with a single
+    INSERT ... ON CONFLICT (phone) statement. With an `identity_map` only
+    customers missing from the map are queried, and every resolved customer
+    is added to it. Returns one customer dict per order, in the same order as
+    `orders`.
+    """
+    identities = []
+    for data in orders:
+        billing = data.get("billing") or {}
+        identities.append((normalize_phone(billing.get("phone") or None), billing.get("email") or None))
+
+    by_phone = {}
+    by_email = {}
+    if identity_map is not None:
+        for phone, email in identities:
+            customer = identity_map.get_customer(phone, email)
+            if customer and phone:
+                by_phone[phone] = customer
+            elif customer:
+                by_email[email] = customer
+
+    columns = (Customer.id, Customer.phone, Customer.email, Customer.first_name, Customer.last_name)
+
+    # Every unresolved phone is looked up, even when its email is already
+    # known: the phone's owner wins over a customer matched by email
+    phones = {phone for phone, email in identities if phone and phone not in by_phone}
+    if phones:
+        for row in db.query(*columns).filter(Customer.phone.in_(phones)):
+            by_phone[row.phone] = dict(row._mapping)
+    emails = {email for phone, email in identities if email and email not in by_email and phone not in by_phone}
+    if emails:
+        for row in db.query(*columns).filter(Customer.email.in_(emails)).order_by(Customer.id):
+            by_email.setdefault(row.email, dict(row._mapping))
+
+    resolved = []
+    pending = []        # new customers identified by phone or email
+    anonymous = []      # new customers without phone and email (one per order)
+    for data, (phone, email) in zip(orders, identities):
+        customer = by_phone.get(phone) if phone else None
+        if not customer and email:
+            customer = by_email.get(email)
+
+        if not customer:
+            billing = data.get("billing") or {}
+            customer = {
+                "id": None,
+                "first_name": billing.get("first_name", ""),
+                "last_name": billing.get("last_name", ""),
+                "email": email,
+                "phone": phone,
+            }
+            if phone or email:
+                pending.append(customer)
+                if phone:
+                    by_phone[phone] = customer
+                if email:
+                    by_email.setdefault(email, customer)
+            else:
+                anonymous.append(customer)
+        resolved.append(customer)
+
+    if pending:
+        stmt = pg_insert(Customer).values([
+            {
+                "first_name": c["first_name"],
+                "last_name": c["last_name"],
+                "email": c["email"],
+                "phone": c["phone"],
+                "client_id": client_id,
+            }
+            for c in pending
+        ])
+        # A no-op update makes RETURNING include rows that already existed
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Customer.phone],
+            set_={"phone": stmt.excluded.phone},
+        ).returning(Customer.id, Customer.phone, Customer.email)
+
+        ids_by_phone = {}
+        ids_by_email = {}
+        for row in db.execute(stmt):
+            if row.phone:
+                ids_by_phone[row.phone] = row.id
+            elif row.email:
+                ids_by_email[row.email] = row.id
+        for c in pending:
+            c["id"] = ids_by_phone.get(c["phone"]) if c["phone"] else ids_by_email.get(c["email"])
+
+    if anonymous:
+        new_customers = [
+            Customer(first_name=c["first_name"], last_name=c["last_name"], client_id=client_id)
+            for c in anonymous
+        ]
+        db.add_all(new_customers)
         db.flush()
-
-    existing_address = db.query(Address).filter_by(
-        customer_id=customer.id,
-        address_1=data["billing"].get("address_1", ""),
-        city=data["billing"].get("city", ""),
-        postcode=data["billing"].get("postcode", "")
-    ).first()
-
-    if not existing_address:
-        address = Address(
-            customer_id=customer.id,
-            company=data["billing"].get("company"),
-            address_1=data["billing"].get("address_1"),
-            address_2=data["billing"].get("address_2"),
-            city=data["billing"].get("city"),
-            state=data["billing"].get("state"),
-            postcode=data["billing"].get("postcode"),
-            country=data["billing"].get("country")
+        for c, obj in zip(anonymous, new_customers):
+            c["id"] = obj.id
+
+    if identity_map is not None:
+        for customer in resolved:
+            identity_map.add_customer(customer)
+
+    return resolved
+
+def _insert_missing_addresses(db: Session, orders: list[dict], customers: list[dict]) -> None:
+    """Insert billing addresses that are not yet stored for their customer."""
+    customer_ids = {c["id"] for c in customers}
+    existing = {
+        (row.customer_id, row.address_1, row.city, row.postcode)
+        for row in db.query(Address.customer_id, Address.address_1, Address.city, Address.postcode)
+        .filter(Address.customer_id.in_(customer_ids))
+    }
+
+    rows = []
+    for data, customer in zip(orders, customers):
+        billing = data.get("billing") or {}
+        key = (
+            customer["id"],
+            billing.get("address_1", ""),
+            billing.get("city", ""),
+            billing.get("postcode", ""),
         )
-        db.add(address)
-
-    order_in_db = db.query(Order).filter_by(order_key=data["order_key"]).first()
-
+        if key in existing:
+            continue
+        existing.add(key)
+        rows.append({
+            "customer_id": customer["id"],
+            "company": billing.get("company"),
+            "address_1": billing.get("address_1"),
+            "address_2": billing.get("address_2"),
+            "city": billing.get("city"),
+            "state": billing.get("state"),
+            "postcode": billing.get("postcode"),
+            "country": billing.get("country"),
+        })
+
+    if rows:
+        db.execute(insert(Address), rows)
+
+def _order_row(data: dict, customer_id: int, client_id: int) -> dict:
     meta = data.get("meta_data", [])
     meta_dict = {entry.get("key"): entry.get("value") for entry in meta}
 
-    if order_in_db:
-        new_status = data["status"]
-        updated = False
+    return {
+        "order_key": data["order_key"],
+        "client_id": client_id,
+        "customer_id": customer_id,
+        "external_id": data["id"],
+        "status": data["status"],
+        "total_amount": float(data["total"]),
+        "created_at": isoparse(data["date_created"]),
+        "modified_at": order_modified_at(data),
+        "payment_method": data.get("payment_method_title"),
+        "attribution_referrer": meta_dict.get("_wc_order_attribution_referrer"),
+        "session_pages": int(meta_dict.get("_wc_order_attribution_session_pages", 0)),
+        "session_count": int(meta_dict.get("_wc_order_attribution_session_count", 0)),
+        "device_type": meta_dict.get("_wc_order_attribution_device_type"),
+    }
+
+def _update_sales_rollup(db: Session, client_id: int, orders: list[dict], written: dict,
+                         existing_orders: dict, item_rows: list[dict]) -> None:
+    """Add the page's new orders and status changes to the daily sales rollups."""
+    new_items = {}
+    for item in item_rows:
+        new_items.setdefault(item["order_id"], []).append(item)
+
+    rollup = SalesRollupDeltas()
+    moved = []
+    for data in orders:
+        row = written.get(data["order_key"])
+        if not row:
+            continue
+        if row.inserted:
+            rollup.add_order(
+                isoparse(data["date_created"]).date(),
+                data["status"],
+                float(data["total"]),
+                new_items.get(row.id, []),
+            )
+            continue
+        existing = existing_orders.get(data["order_key"])
+        # An order inserted by a concurrent sync after our lookup was counted by that sync
+        if existing and existing.status != data["status"]:
+            moved.append((existing, data["status"]))
+
+    if moved:
+        stored_items = {}
+        for item in (
+            db.query(OrderItem.order_id, OrderItem.product_id, OrderItem.product_name, OrderItem.quantity, OrderItem.price)
+            .filter(OrderItem.order_id.in_([existing.id for existing, _ in moved]))
+        ):
+            stored_items.setdefault(item.order_id, []).append(item._asdict())
+        for existing, status in moved:
+            rollup.move_order(
+                existing.created_at.date(),
+                existing.status,
+                status,
+                existing.total_amount,
+                stored_items.get(existing.id, []),
+            )
 
-        if order_in_db.status != new_status:
-            order_in_db.status = new_status
-            updated = True
+    rollup.apply(db, client_id)
 
-        new_payment_method = data.get("payment_method_title")
-        if order_in_db.payment_method != new_payment_method:
-            order_in_db.payment_method = new_payment_method
-            updated = True
+def process_orders_page(db: Session, orders: list[dict], client_id: int, notify: bool = True,
+                        identity_map: IdentityMap | None = None) -> dict:
+    """
+    Batched equivalent of `process_order_data` for a whole WooCommerce page.
 
-        if updated:
-            db.add(order_in_db)
-            db.flush()
-            print(f"🔄 Updated order #{order_in_db.external_id} to status: {new_status}")
-
-            if customer.phone:
-                try:
-                    full_name = f"{customer.first_name} {customer.last_name}".strip()
-                    template_name = WHATSAPP_TEMPLATES.get(new_status)
-
-                    if template_name:
-                        send_whatsapp_template(
-                            phone_number=customer.phone,
-                            customer_name=full_name,
-                            order_number=str(order_in_db.external_id),
-                            template_name=template_name
-                        )
-                    else:
-                        print(f"⚠️ No template configured for status: {new_status}")
-                except Exception as e:
-                    print(f"❌ WhatsApp send failed: {e}")
+    Customers, addresses, orders and products for the page are resolved with a
+    handful of set-based IN (...) lookups and written with bulk
+    INSERT ... ON CONFLICT statements, instead of several SELECTs per order
+    and one per line item. The caller is responsible for committing.
 
-        return
+    Status notifications for new or changed orders are not sent here: they are
+    written to the order_notifications outbox in the same transaction (unless
+    `notify` is False, e.g. for backfills) and delivered by
+    send_order_notifications_task.
 
-    order = Order(
-        order_key=data["order_key"],
-        customer_id=customer.id,
-        external_id=data["id"],
-        status=data["status"],
-        total_amount=float(data["total"]),
-        created_at=isoparse(data["date_created"]),
-        payment_method=data.get("payment_method_title"),
-        attribution_referrer=meta_dict.get("_wc_order_attribution_referrer"),
-        session_pages=int(meta_dict.get("_wc_order_attribution_session_pages", 0)),
-        session_count=int(meta_dict.get("_wc_order_attribution_session_count", 0)),
-        device_type=meta_dict.get("_wc_order_attribution_device_type")
-    )
-    db.add(order)
-    db.flush()
-
-    for item in data.get("line_items", []):
-        product = db.query(Product).filter_by(external_id=item["product_id"]).first()
-        product_id = product.external_id if product else None
-
-        order_item = OrderItem(
-            order_id=order.id,
-            product_name=item["name"],
-            product_id=product_id,
-            quantity=item["quantity"],
-            price=float(item["price"])
+    Webhook deliveries and polled pages can arrive out of order: a payload
+    whose date_modified_gmt is older than the stored order's is "stale" and
+    dropped, so it can't roll a status back.
+
+    Returns:
+        dict with the number of orders "created", "updated" (status or payment
+        method changed), "unchanged" and "stale", and the "notifications" queued
+    """
+    result = {"created": 0, "updated": 0, "unchanged": 0, "stale": 0, "notifications": []}
+
+    # The same order can show up twice if it moved between pages; keep the latest copy
+    orders = list({data["order_key"]: data for data in orders}.values())
+    if not orders:
+        return result
+
+    customers = _resolve_customers(db, orders, client_id, identity_map)
+    _insert_missing_addresses(db, orders, customers)
+
+    # Locked until commit, so a concurrent webhook can't move the same order's
+    # status in the sales rollup twice
+    existing_orders = {
+        row.order_key: row
+        for row in db.query(
+            Order.id, Order.order_key, Order.status, Order.payment_method, Order.created_at, Order.total_amount,
+            Order.modified_at,
         )
-        db.add(order_item)
+        .filter(Order.order_key.in_([data["order_key"] for data in orders]))
+        .order_by(Order.order_key)
+        .with_for_update()
+    }
+
+    rows = []
+    touched = []    # unchanged orders whose modification time still moves forward
+    for data, customer in zip(orders, customers):
+        existing = existing_orders.get(data["order_key"])
+        modified_at = order_modified_at(data)
+        if existing and existing.modified_at and modified_at and modified_at < existing.modified_at:
+            result["stale"] += 1
+            continue
+        if existing and (
+            existing.status == data["status"]
+            and existing.payment_method == data.get("payment_method_title")
+        ):
+            result["unchanged"] += 1
+            if modified_at and (not existing.modified_at or modified_at > existing.modified_at):
+                touched.append({"id": existing.id, "modified_at": modified_at})
+            continue
+        rows.append(_order_row(data, customer["id"], client_id))
+
+    if touched:
+        db.execute(update(Order), touched)
+    if not rows:
+        return result
+
+    stmt = pg_insert(Order).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Order.order_key],
+        set_={
+            "status": stmt.excluded.status,
+            "payment_method": stmt.excluded.payment_method,
+            "modified_at": stmt.excluded.modified_at,
+        },
+        # Rows inserted by a concurrent sync after our lookup aren't locked above
+        where=or_(
+            Order.modified_at.is_(None),
+            stmt.excluded.modified_at.is_(None),
+            stmt.excluded.modified_at >= Order.modified_at,
+        ),
+    ).returning(Order.id, Order.order_key, literal_column("xmax = 0").label("inserted"))
+    written = {row.order_key: row for row in db.execute(stmt)}
+
+    inserted_orders = [data for data in orders if data["order_key"] in written and written[data["order_key"]].inserted]
+
+    product_ids = {
+        item["product_id"]
+        for data in inserted_orders
+        for item in data.get("line_items", [])
+        if item.get("product_id")
+    }
+    known_products = set()
+    if identity_map is not None:
+        known_products = {product_id for product_id in product_ids if identity_map.has_product(product_id)}
+    missing_products = product_ids - known_products
+    if missing_products:
+        found = {
+            row.external_id
+            for row in db.query(Product.external_id).filter(
+                Product.client_id == client_id,
+                Product.external_id.in_(missing_products),
+            )
+        }
+        known_products |= found
+        if identity_map is not None:
+            identity_map.add_products(found)
+
+    item_rows = [
+        {
+            "order_id": written[data["order_key"]].id,
+            "client_id": client_id,
+            "product_name": item["name"],
+            "product_id": item["product_id"] if item.get("product_id") in known_products else None,
+            "quantity": item["quantity"],
+            "price": float(item["price"]),
+        }
+        for data in inserted_orders
+        for item in data.get("line_items", [])
+    ]
+    if item_rows:
+        db.execute(insert(OrderItem), item_rows)
+
+    _update_sales_rollup(db, client_id, orders, written, existing_orders, item_rows)
+    refresh_customer_metrics(
+        db, client_id, [customer["id"] for data, customer in zip(orders, customers) if data["order_key"] in written]
+    )
 
-    if customer.phone:
-        try:
-            full_name = f"{customer.first_name} {customer.last_name}".strip()
-            template_name = WHATSAPP_TEMPLATES.get(order.status)
-
-            if template_name:
-                send_whatsapp_template(
-                    phone_number=customer.phone,
-                    customer_name=full_name,
-                    order_number=str(order.external_id),
-                    template_name=template_name
-                )
-            else:
-                print(f"⚠️ No template configured for order status: {order.status}")
-        except Exception as e:
-            print(f"❌ WhatsApp send failed: {e}")
+    notifications = result["notifications"]
+    for data, customer in zip(orders, customers):
+        row = written.get(data["order_key"])
+        if not row:
+            continue
+        if row.inserted:
+            result["created"] += 1
+        else:
+            result["updated"] += 1
+            print(f"🔄 Updated order #{data['id']} to status: {data['status']}")
+        if notify:
+            notification = _notification_row(customer, row.id, data, client_id)
+            if notification:
+                notifications.append(notification)
+
+    if notifications:
+        db.execute(insert(OrderNotification), notifications)
+    return result
+
+def process_order_data(db: Session, data: dict, client_id: int, notify: bool = True) -> dict:
+    return process_orders_page(db, [data], client_id, notify=notify)
 
 @shared_task(name="fetch_orders_task", bind=True, max_retries=3)
-def fetch_orders_task(self, client_id: int = None, full_fetch: bool = False):
+def fetch_orders_task(self, client_id: int = None, full_fetch: bool = False, notify: bool = None):
     """
     Fetch WooCommerce orders for a client with distributed locking.
     
     Args:
         client_id: ID of the client to fetch orders for
         full_fetch: If True, fetch all orders; if False, fetch only new orders
+        notify: Queue WhatsApp status notifications for changed orders.
+            Defaults to True for incremental syncs and False for full syncs (backfills)
     """
     if not client_id:
         print("⚠️ No client_id provided. Skipping task.")
@@ -246,6 +604,7 @@ def fetch_orders_task(self, client_id: int = None, full_fetch: bool = False):
         return
 
     db = SessionLocal()
+    started_at = datetime.utcnow()
 
     try:
         client = db.query(Client).filter_by(id=client_id).first()
@@ -263,70 +622,144 @@ def fetch_orders_task(self, client_id: int = None, full_fetch: bool = False):
             print(f"⚠️ Decrypted credentials missing for {client.email}. Skipping task.")
             return
         
-        wc_base_url = f"{client.store_url}/wp-json/wc/v3/orders"
+        wc = get_wc_client(client.store_url, consumer_key, consumer_secret)
         per_page = 100
-        page = 1
 
         # Determine sync range
         state_key = f"last_order_sync_client_{client_id}"
+        watermark_key = f"last_order_modified_client_{client_id}"
         sync_state = db.query(SyncState).filter_by(key=state_key).first()
-
-        if full_fetch or not sync_state:
-            after_date = "2000-01-01T00:00:00Z"
+        full_sync = full_fetch or not sync_state
+        if notify is None:
+            notify = not full_sync
+
+        stats = {
+            "full_sync": full_sync,
+            "fetched": 0,
+            "created": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "stale": 0,
+            "notifications": 0,
+        }
+        new_watermark = None
+        completed = False
+        # Repeat customers and products resolved once per sync; warmed lazily so
+        # the frequent empty incremental syncs don't pay for it
+        identity_map = IdentityMap()
+        identity_map_warm = False
+
+        # Fetch orders: pages are downloaded concurrently over one pooled
+        # client on a fetcher thread and committed here in page order
+        checkpoint = get_full_sync_checkpoint(db, client_id) if full_sync else None
+        resumed_pages = checkpoint["pages_done"] if checkpoint else 0
+
+        if full_sync and checkpoint and checkpoint.get("cursor"):
+            # Resume after the last committed order instead of starting over
+            # (1s overlap: orders created in the same second are re-upserted)
+            resume_after = (parse_gmt(checkpoint["cursor"]) - timedelta(seconds=1)).strftime("%Y-%m-%dT%H:%M:%S")
+            params = {
+                "per_page": per_page,
+                "_fields": ORDER_FIELDS,
+                "after": resume_after,
+                "dates_are_gmt": "true",
+                "orderby": "date",
+                "order": "asc",
+            }
+            new_watermark = checkpoint.get("watermark")
+            print(f"⏯️ Resuming full sync for client {client.email} after page {resumed_pages} ({resume_after} GMT)")
+        elif full_sync:
+            params = {
+                "per_page": per_page,
+                "_fields": ORDER_FIELDS,
+                "after": "2000-01-01T00:00:00Z",
+                "orderby": "date",
+                "order": "asc",
+            }
+            checkpoint = {
+                "pages_done": 0,
+                "total_pages": None,
+                "cursor": None,
+                "watermark": None,
+                "started_at": datetime.utcnow().isoformat() + "Z",
+            }
             print(f"🌍 Full sync for client {client.email}")
         else:
-            after_date = sync_state.value
-            print(f"🕒 Incremental sync for {client.email} after {after_date}")
-
-        total_orders_fetched = 0
-        total_new_orders = 0
-        total_updated_orders = 0
-
-        # Fetch orders
-        while True:
-            url = f"{wc_base_url}?per_page={per_page}&page={page}&after={after_date}&orderby=date&order=asc"
-            
-            try:
-                with httpx.Client(timeout=60.0) as client_http:
-                    response = client_http.get(url, auth=(consumer_key, consumer_secret))
-            except Exception as e:
-                print(f"❌ Fetch error for {client.email}: {e}")
-                # Retry with exponential backoff
-                raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
-
-            if response.status_code != 200:
-                print(f"⚠️ API error ({client.email}): {response.status_code} - {response.text}")
-                if response.status_code in [401, 403]:
-                    # Don't retry authentication errors
-                    break
-                # Retry other errors
-                raise self.retry(countdown=60)
-
-            orders = response.json()
+            # Clients synced before the modified-watermark existed fall back to the created-at timestamp
+            watermark = get_sync_state(db, watermark_key) or sync_state.value
+            modified_after = (parse_gmt(watermark) - WATERMARK_OVERLAP).strftime("%Y-%m-%dT%H:%M:%S")
+            # Newest first: an order modified mid-sync moves to page 1 and pushes
+            # the rest one place back. The pushed orders are re-fetched (duplicates
+            # are harmless), and the oldest ones, pushed past X-WP-TotalPages, are
+            # picked up because iter_pages keeps paging until a short page
+            params = {
+                "per_page": per_page,
+                "_fields": ORDER_FIELDS,
+                "modified_after": modified_after,
+                "dates_are_gmt": "true",
+                "orderby": "modified",
+                "order": "desc",
+            }
+            print(f"🕒 Incremental sync for {client.email}: orders modified after {modified_after} GMT")
+
+        def process_page(fetched):
+            nonlocal new_watermark, identity_map_warm
+            page, orders, total_pages = fetched
             if not orders:
-                break
+                return
 
-            print(f"📦 {client.email} - Page {page}: {len(orders)} orders")
+            print(f"📦 {client.email} - Page {page}/{total_pages or '?'}: {len(orders)} orders")
 
             try:
-                for order in orders:
-                    # Track if order is new or updated
-                    existing = db.query(Order).filter_by(order_key=order["order_key"]).first()
-                    if existing:
-                        total_updated_orders += 1
-                    else:
-                        total_new_orders += 1
-                    
-                    process_order_data(db, order, client_id=client.id)
-                
+                if not identity_map_warm:
+                    identity_map.warm(db, client.id)
+                    identity_map_warm = True
+                result = process_orders_page(db, orders, client_id=client.id, notify=notify, identity_map=identity_map)
+
+                if full_sync:
+                    # Checkpoint in the same transaction as the page it describes
+                    checkpoint["pages_done"] += 1
+                    if total_pages:
+                        checkpoint["total_pages"] = resumed_pages + total_pages
+                    checkpoint["cursor"] = orders[-1].get("date_created_gmt") or checkpoint["cursor"]
+                    set_full_sync_checkpoint(db, client.id, checkpoint)
+
                 db.commit()
-                total_orders_fetched += len(orders)
+                stats["fetched"] += len(orders)
+                for counter in ("created", "updated", "unchanged", "stale"):
+                    stats[counter] += result[counter]
+                stats["notifications"] += len(result["notifications"])
+                if not full_sync:
+                    new_watermark = max_modified_gmt(orders, new_watermark)
+                extend_sync_lock(client_id, timeout=300)
             except Exception as e:
                 db.rollback()
+                # Customers created by the rolled back page are gone
+                identity_map.clear()
                 print(f"❌ Error processing {client.email}: {e}")
                 raise self.retry(exc=e, countdown=60)
 
-            page += 1
+        try:
+            if full_sync and not checkpoint["watermark"]:
+                # Read once when the full sync starts and kept across resumes;
+                # orders edited while the pages are walked are fetched again by
+                # the first incremental sync, which starts from this watermark
+                new_watermark = checkpoint["watermark"] = latest_store_modified_gmt(wc)
+
+            stage_stats = run_streaming_stage(wc.iter_pages("orders", params), process_page)
+            completed = True
+            stats["timings"] = stage_stats
+            stats["identity_cache"] = {"hits": identity_map.hits, "misses": identity_map.misses}
+            print(f"   ⏱️ {client.email}: {format_stage_stats(stage_stats)}")
+        except WooCommerceAPIError as e:
+            print(f"⚠️ API error ({client.email}): {e.status_code} - {e.text}")
+            if e.status_code not in [401, 403]:
+                # Retry other errors; authentication errors are not retried
+                raise self.retry(countdown=60)
+        except httpx.HTTPError as e:
+            print(f"❌ Fetch error for {client.email}: {e}")
+            # Retry with exponential backoff
+            raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
 
         # Update last sync timestamp
         latest_time = datetime.utcnow().isoformat() + "Z"
@@ -334,13 +767,30 @@ def fetch_orders_task(self, client_id: int = None, full_fetch: bool = False):
             sync_state.value = latest_time
         else:
             db.add(SyncState(key=state_key, value=latest_time))
-        
+        if completed and new_watermark:
+            set_sync_state(db, watermark_key, new_watermark)
+        if completed and full_sync:
+            clear_full_sync_checkpoint(db, client_id)
+        if completed:
+            stats["poll_schedule"] = record_order_poll(
+                db, client_id, stats["created"] + stats["updated"], now=started_at
+            )
+        stats["finished_at"] = latest_time
+        set_sync_state(db, f"last_order_sync_stats_client_{client_id}", json.dumps(stats))
+
         # Update client's last_synced_at
         client.last_synced_at = datetime.utcnow()
         db.commit()
 
+        if stats["notifications"]:
+            try:
+                send_order_notifications_task.delay()
+            except Exception as e:
+                # The periodic drain will pick them up
+                print(f"⚠️ Could not enqueue send_order_notifications_task: {e}")
+
         print(f"✅ Sync complete for {client.email}")
-        print(f"   📊 Total processed: {total_orders_fetched} | New: {total_new_orders} | Updated: {total_updated_orders}")
+        print(f"   📊 Total processed: {stats['fetched']} | New: {stats['created']} | Updated: {stats['updated']} | Unchanged: {stats['unchanged']} | Stale: {stats['stale']} | Notifications queued: {stats['notifications']}")
 
     except Exception as e:
         print(f"❌ Unexpected error for client {client_id}: {e}")
@@ -1,27 +1,190 @@
 import httpx
 from celery import shared_task
 from models import Client
+from sqlalchemy import func, literal_column, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from cryptography.fernet import Fernet
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
 from models import Product
 from database import SessionLocal
+from utils.wc_client import get_wc_client, WooCommerceAPIError
+from utils.pipeline import run_streaming_stage, format_stage_stats
+from utils.redis_lock import acquire_sync_lock, release_sync_lock, extend_sync_lock
+from tasks.fetch_orders import (
+    get_sync_state, set_sync_state, parse_gmt, max_modified_gmt, WATERMARK_OVERLAP,
+)
 
-db: Session = SessionLocal()
+PRODUCT_SYNC_LOCK = "product_sync_lock"
+PRODUCT_SYNC_LOCK_TIMEOUT = 600
+
+# Only the product fields the upsert reads (`_fields` projection): skips
+# descriptions, images, attributes, variations and links
+PRODUCT_FIELDS = ",".join([
+    "id", "name", "short_description", "regular_price", "sale_price", "total_sales",
+    "categories.name", "stock_status", "weight", "date_created", "date_modified", "date_modified_gmt",
+])
+
+# How often the store's product IDs are compared with ours to drop deleted products
+PRODUCT_RECONCILE_INTERVAL = timedelta(hours=int(os.getenv("PRODUCT_RECONCILE_INTERVAL_HOURS", 24)))
+
+# Listings used to reconcile deletions go by ascending ID: new products land on
+# the last page instead of pushing unseen ones back a page
+PRODUCT_ID_ORDER = {"orderby": "id", "order": "asc"}
+
+def product_watermark_key(client_id: int) -> str:
+    return f"last_product_sync_client_{client_id}"
+
+def product_reconcile_key(client_id: int) -> str:
+    return f"last_product_reconcile_client_{client_id}"
+
+def _parse_wc_datetime(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def _product_row(data: dict, client_id: int) -> dict:
+    return {
+        "client_id": client_id,
+        "external_id": data["id"],
+        "name": data["name"],
+        "short_description": data.get("short_description"),
+        "regular_price": float(data.get("regular_price") or 0),
+        "sales_price": float(data.get("sale_price") or 0),
+        "total_sales": data.get("total_sales") or 0,
+        "categories": ", ".join([cat["name"] for cat in data.get("categories", [])]),
+        "stock_status": data.get("stock_status"),
+        "weight": float(data.get("weight") or 0),
+        "date_created": _parse_wc_datetime(data.get("date_created")),
+        "date_modified": _parse_wc_datetime(data.get("date_modified")),
+    }
+
+def process_products_page(db: Session, products: list[dict], client_id: int) -> dict:
+    """
+    Upsert a page of a client's WooCommerce products with a single
+    INSERT ... ON CONFLICT (client_id, external_id) DO UPDATE statement.
+
+    Existing rows are only rewritten when date_modified changed (or
+    total_sales / stock_status, which WooCommerce updates without touching
+    date_modified), so unchanged catalog entries cost no writes. The caller is
+    responsible for committing.
+
+    Returns:
+        dict with the number of products "created", "updated" and "unchanged"
+    """
+    rows = list({data["id"]: _product_row(data, client_id) for data in products}.values())
+    if not rows:
+        return {"created": 0, "updated": 0, "unchanged": 0}
+
+    stmt = pg_insert(Product).values(rows)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Product.client_id, Product.external_id],
+        set_={
+            column: getattr(excluded, column)
+            for column in rows[0]
+            if column not in ("client_id", "external_id", "date_created", "date_modified")
+        } | {
+            "date_created": func.coalesce(excluded.date_created, Product.date_created),
+            "date_modified": func.coalesce(excluded.date_modified, Product.date_modified),
+        },
+        where=or_(
+            Product.date_modified.is_distinct_from(excluded.date_modified),
+            Product.total_sales.is_distinct_from(excluded.total_sales),
+            Product.stock_status.is_distinct_from(excluded.stock_status),
+        ),
+    ).returning(literal_column("xmax = 0").label("inserted"))
+
+    written = db.execute(stmt).all()
+    created = sum(1 for row in written if row.inserted)
+    return {
+        "created": created,
+        "updated": len(written) - created,
+        "unchanged": len(rows) - len(written),
+    }
+
+def fetch_remote_product_ids(wc) -> set[int]:
+    """IDs of every product currently in the store (an `_fields=id` listing)."""
+    ids = set()
+    for _, products, _ in wc.iter_pages("products", {"per_page": 100, "_fields": "id", **PRODUCT_ID_ORDER}):
+        ids.update(product["id"] for product in products)
+    return ids
+
+def reconcile_deleted_products(db: Session, client_id: int, remote_ids: set[int],
+                               expected_total: int | None) -> int:
+    """
+    Delete the client's products that are no longer in the store. Order items
+    keep their product_id and product_name. Committing is left to the caller.
+
+    `expected_total` is the store's X-WP-Total read before `remote_ids` was
+    listed. A product deleted in the store mid-listing shifts the following
+    ones back a page, where they are never seen; when fewer IDs than that were
+    seen (or the store sent no total) nothing is deleted and the reconcile is
+    retried on the next sync.
+
+    Returns:
+        Number of products deleted
+    """
+    if expected_total is None or len(remote_ids) < expected_total:
+        print(
+            f"⚠️ Client {client_id}: listed {len(remote_ids)} product IDs but the store reports "
+            f"{expected_total if expected_total is not None else 'no'} total, skipping deletions"
+        )
+        return 0
+
+    local_ids = {
+        external_id
+        for (external_id,) in db.query(Product.external_id).filter(
+            Product.client_id == client_id, Product.external_id.isnot(None)
+        )
+    }
+    deleted_ids = local_ids - remote_ids
+
+    deleted = 0
+    if deleted_ids:
+        deleted = (
+            db.query(Product)
+            .filter(Product.client_id == client_id, Product.external_id.in_(deleted_ids))
+            .delete(synchronize_session=False)
+        )
+
+    set_sync_state(db, product_reconcile_key(client_id), datetime.utcnow().isoformat() + "Z")
+    return deleted
+
+def latest_store_product_modified_gmt(wc) -> str | None:
+    """Most recent date_modified_gmt across the store's products, on the store's own clock."""
+    products, _ = wc.get_page(
+        "products", {"per_page": 1, "orderby": "modified", "order": "desc", "_fields": "date_modified_gmt"}, 1
+    )
+    return max_modified_gmt(products)
 
 @shared_task(name="fetch_products_task", bind=True, max_retries=3)
-def fetch_products_task(self, client_id: int = None):
+def fetch_products_task(self, client_id: int = None, full_fetch: bool = False):
     """
     Fetch WooCommerce products for a client and save/update to the DB.
     Handles client authentication and decryption as fetch_orders_task does.
+
+    The first sync (or `full_fetch`) downloads the whole catalog. Later syncs
+    only ask for products modified after the client's `last_product_sync`
+    watermark, and every PRODUCT_RECONCILE_INTERVAL the store's product IDs
+    are compared with the client's products to remove deleted ones.
+
+    Each run uses its own DB session and holds a per-client Redis lock, so
+    product syncs for different clients can run in parallel across workers
+    while two syncs of the same store never overlap.
     """
-    
+    if not client_id:
+        print("⚠️ No client_id provided for product fetch.")
+        return
 
-    try:
-        if not client_id:
-            print("⚠️ No client_id provided for product fetch.")
-            return
+    if not acquire_sync_lock(client_id, timeout=PRODUCT_SYNC_LOCK_TIMEOUT, lock_name=PRODUCT_SYNC_LOCK):
+        print(f"⚠️ Product sync already in progress for client {client_id}. Skipping.")
+        return
+
+    db = SessionLocal()
 
+    try:
         client = db.query(Client).filter_by(id=client_id).first()
         if not client:
             print(f"❌ Client {client_id} not found for product sync.")
@@ -39,88 +202,87 @@ def fetch_products_task(self, client_id: int = None):
             print(f"⚠️ Decrypted credentials missing for client {client_id}.")
             return
 
-        wc_base_url = f"{client.store_url}/wp-json/wc/v3/products"
+        wc = get_wc_client(client.store_url, consumer_key, consumer_secret)
         per_page = 100
-        page = 1
 
         print(f"[DB INFO] Connected to: {db.bind.url} | [Client] {client.email}")
 
-        while True:
-            url = f"{wc_base_url}?per_page={per_page}&page={page}"
-            print(f"[{client.email}] Fetching products page {page}...")
+        watermark = get_sync_state(db, product_watermark_key(client.id))
+        full_sync = full_fetch or not watermark
+        params = {"per_page": per_page, "_fields": PRODUCT_FIELDS}
+        if full_sync:
+            # Products edited while the catalogue is listed are fetched again by
+            # the next incremental product sync, which starts from this watermark
+            new_watermark = latest_store_product_modified_gmt(wc)
+            listed_total = wc.get_total("products")
+            seen_ids = set()
+            params.update(PRODUCT_ID_ORDER)
+            print(f"🌍 Full product sync for {client.email}")
+        else:
+            new_watermark = watermark
+            seen_ids = None
+            modified_after = (parse_gmt(watermark) - WATERMARK_OVERLAP).strftime("%Y-%m-%dT%H:%M:%S")
+            params.update({
+                "modified_after": modified_after,
+                "dates_are_gmt": "true",
+                "orderby": "modified",
+                "order": "desc",
+            })
+            print(f"🕒 Incremental product sync for {client.email}: modified after {modified_after} GMT")
 
-            try:
-                with httpx.Client(timeout=60.0) as client_http:
-                    response = client_http.get(url, auth=(consumer_key, consumer_secret))
-            except Exception as e:
-                print(f"❌ HTTP exception while fetching products for {client.email}: {e}")
-                # Optionally: self.retry(exc=e, countdown=60)
-                break
-
-            if response.status_code != 200:
-                print(f"❌ Failed to fetch products from {client.email}: {response.text}")
-                if response.status_code in [401, 403]:
-                    break  # Authentication problems: don't retry
-                # Optionally: raise self.retry(countdown=60)
-                break
-
-            products = response.json()
+        def process_page(fetched):
+            nonlocal new_watermark
+            page, products, _ = fetched
             if not products:
                 print(f"✅ [{client.email}] No more products to process.")
-                break
+                return
 
             try:
-                for data in products:
-                    existing = db.query(Product).filter_by(external_id=data["id"]).first()
-
-                    date_created = data.get("date_created")
-                    date_modified = data.get("date_modified")
-
-                    if date_created:
-                        date_created = datetime.fromisoformat(date_created.replace("Z", "+00:00"))
-                    if date_modified:
-                        date_modified = datetime.fromisoformat(date_modified.replace("Z", "+00:00"))
-
-                    if existing:
-                        # Update existing product
-                        existing.name = data["name"]
-                        existing.short_description = data.get("short_description")
-                        existing.regular_price = float(data.get("regular_price") or 0)
-                        existing.sales_price = float(data.get("sale_price") or 0)
-                        existing.total_sales = data.get("total_sales") or 0
-                        existing.categories = ", ".join([cat["name"] for cat in data.get("categories", [])])
-                        existing.stock_status = data.get("stock_status")
-                        existing.weight = float(data.get("weight") or 0)
-                        if date_created:
-                            existing.date_created = date_created
-                        if date_modified:
-                            existing.date_modified = date_modified 
-                    else:
-                        product = Product(
-                            external_id=data["id"],
-                            name=data["name"],
-                            short_description=data.get("short_description"),
-                            regular_price=float(data.get("regular_price") or 0),
-                            sales_price=float(data.get("sale_price") or 0),
-                            total_sales=data.get("total_sales") or 0,
-                            categories=", ".join([cat["name"] for cat in data.get("categories", [])]),
-                            stock_status=data.get("stock_status"),
-                            weight=float(data.get("weight") or 0),
-                            date_created=date_created,
-                            date_modified=date_modified,
-                        )
-                        db.add(product)
+                result = process_products_page(db, products, client.id)
                 db.commit()
-                print(f"✅ [{client.email}] Committed page {page}")
+                if full_sync:
+                    seen_ids.update(product["id"] for product in products)
+                else:
+                    new_watermark = max_modified_gmt(products, new_watermark)
+                extend_sync_lock(client_id, timeout=PRODUCT_SYNC_LOCK_TIMEOUT, lock_name=PRODUCT_SYNC_LOCK)
+                print(
+                    f"✅ [{client.email}] Committed page {page}: {result['created']} new, "
+                    f"{result['updated']} updated, {result['unchanged']} unchanged"
+                )
             except Exception as e:
                 db.rollback()
                 print(f"❌ Failed to save products from page {page} for {client.email}: {e}")
                 # Optionally: raise self.retry(exc=e, countdown=60)
-                break
-            page += 1
+                raise
+
+        # Pages are downloaded concurrently on a fetcher thread while earlier pages are written
+        try:
+            stage_stats = run_streaming_stage(wc.iter_pages("products", params), process_page)
+            print(f"⏱️ [{client.email}] Products: {format_stage_stats(stage_stats)}")
+
+            last_reconcile = get_sync_state(db, product_reconcile_key(client.id))
+            if full_sync or not last_reconcile or datetime.utcnow() - parse_gmt(last_reconcile) >= PRODUCT_RECONCILE_INTERVAL:
+                if full_sync:
+                    remote_ids, expected_total = seen_ids, listed_total
+                else:
+                    expected_total = wc.get_total("products")
+                    remote_ids = fetch_remote_product_ids(wc)
+                deleted = reconcile_deleted_products(db, client.id, remote_ids, expected_total)
+                print(f"🧹 [{client.email}] Reconciled {len(remote_ids)} product IDs, {deleted} deleted")
+
+            if new_watermark:
+                set_sync_state(db, product_watermark_key(client.id), new_watermark)
+            db.commit()
+        except WooCommerceAPIError as e:
+            # Authentication problems and other API errors: don't retry
+            print(f"❌ Failed to fetch products from {client.email}: {e.text}")
+        except httpx.HTTPError as e:
+            print(f"❌ HTTP exception while fetching products for {client.email}: {e}")
+            # Optionally: self.retry(exc=e, countdown=60)
     except Exception as e:
         print(f"❌ Unexpected error in fetch_products_task for client {client_id}: {e}")
         db.rollback()
         # Optionally: raise self.retry(exc=e, countdown=120)
     finally:
         db.close()
+        release_sync_lock(client_id, lock_name=PRODUCT_SYNC_LOCK)
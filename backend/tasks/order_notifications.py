@@ -0,0 +1,72 @@
+from datetime import datetime
+from celery import shared_task
+from database import SessionLocal
+from models import OrderNotification
+from tasks.send_whatsapp import send_whatsapp_template
+
+# Notifications that keep failing are given up after this many attempts
+MAX_NOTIFICATION_ATTEMPTS = 5
+
+@shared_task(name="send_order_notifications_task")
+def send_order_notifications_task(batch_size: int = 100):
+    """
+    Drain the order_notifications outbox filled by order ingestion.
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several workers
+    can drain concurrently without sending the same message twice, and order
+    ingestion never waits on the WhatsApp API.
+    """
+    db = SessionLocal()
+    sent = 0
+    failed = 0
+    last_id = 0
+    try:
+        while True:
+            # Walk forward by id so rows that failed in this run wait for the next one
+            batch = (
+                db.query(OrderNotification)
+                .filter(OrderNotification.status == "PENDING", OrderNotification.id > last_id)
+                .order_by(OrderNotification.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not batch:
+                break
+
+            for notification in batch:
+                last_id = notification.id
+                notification.attempts += 1
+                try:
+                    status_code = send_whatsapp_template(
+                        phone_number=notification.phone,
+                        customer_name=notification.customer_name,
+                        order_number=notification.order_number,
+                        template_name=notification.template_name
+                    )
+                    if status_code != 200:
+                        raise RuntimeError(f"WhatsApp API returned {status_code}")
+                    notification.status = "SENT"
+                    notification.sent_at = datetime.utcnow()
+                    notification.last_error = None
+                    sent += 1
+                except Exception as e:
+                    print(f"❌ WhatsApp send failed for order #{notification.order_number}: {e}")
+                    notification.last_error = str(e)
+                    if notification.attempts >= MAX_NOTIFICATION_ATTEMPTS:
+                        notification.status = "FAILED"
+                        failed += 1
+
+            db.commit()
+
+            if len(batch) < batch_size:
+                break
+    except Exception as e:
+        print(f"❌ Error draining order notifications: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+    if sent or failed:
+        print(f"📲 Order notifications: {sent} sent, {failed} given up")
+    return {"sent": sent, "failed": failed}
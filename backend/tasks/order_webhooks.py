@@ -0,0 +1,50 @@
+from datetime import datetime
+from celery import shared_task
+from database import SessionLocal
+from models import Client
+from tasks.fetch_orders import process_orders_page, set_sync_state
+from tasks.order_notifications import send_order_notifications_task
+from tasks.poll_scheduler import webhook_state_key
+
+@shared_task(name="process_order_webhook_task", bind=True, max_retries=5)
+def process_order_webhook_task(self, client_id: int, order: dict):
+    """
+    Ingest one order delivered by a WooCommerce order.created / order.updated webhook.
+
+    The payload has the same shape as an order from the REST API, so it goes
+    through the same `process_orders_page` path as the polling sync, which
+    drops it if the stored order was modified after it (deliveries and retries
+    can arrive out of order). The time
+    of the last delivery is recorded so polling can back off for stores whose
+    webhooks are working.
+    """
+    db = SessionLocal()
+    try:
+        client = db.query(Client).filter_by(id=client_id).first()
+        if not client:
+            print(f"⚠️ Webhook for unknown client {client_id}. Skipping.")
+            return
+
+        result = process_orders_page(db, [order], client_id=client.id, notify=True)
+        set_sync_state(db, webhook_state_key(client.id), datetime.utcnow().isoformat() + "Z")
+        db.commit()
+
+        print(
+            f"🪝 Webhook order #{order.get('id')} for {client.email}: "
+            f"{result['created']} new, {result['updated']} updated, {result['stale']} stale"
+        )
+
+        if result["notifications"]:
+            try:
+                send_order_notifications_task.delay()
+            except Exception as e:
+                # The periodic drain will pick them up
+                print(f"⚠️ Could not enqueue send_order_notifications_task: {e}")
+
+        return {k: v for k, v in result.items() if k != "notifications"}
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error processing webhook order for client {client_id}: {e}")
+        raise self.retry(exc=e, countdown=30 * (2 ** self.request.retries))
+    finally:
+        db.close()
@@ -0,0 +1,119 @@
+"""
+Adaptive per-store polling schedule for the periodic order sync.
+File: tasks/poll_scheduler.py
+
+Every store gets a next-poll time derived from its observed order activity:
+stores that keep changing are polled every minute, quiet stores back off
+step by step up to ORDER_POLL_MAX_INTERVAL. The schedule is kept as JSON in
+SyncState under `order_poll_schedule_client_{id}`.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from models import Client, SyncState
+
+ORDER_POLL_MIN_INTERVAL = int(os.getenv("ORDER_POLL_MIN_INTERVAL_SECONDS", 60))
+ORDER_POLL_MAX_INTERVAL = int(os.getenv("ORDER_POLL_MAX_INTERVAL_SECONDS", 3600))
+# Each poll without changes multiplies the interval by this factor
+ORDER_POLL_BACKOFF = float(os.getenv("ORDER_POLL_BACKOFF", 2.0))
+# Weight of the latest poll in the moving average of the order rate
+ORDER_RATE_SMOOTHING = 0.3
+# Beat fires every minute; polls due within this margin are taken on the current tick
+POLL_DUE_TOLERANCE = timedelta(seconds=30)
+# Stores delivering order webhooks are only polled this often, as a reconciliation fallback
+WEBHOOK_RECONCILE_INTERVAL = int(os.getenv("WEBHOOK_RECONCILE_INTERVAL_MINUTES", 30)) * 60
+
+def schedule_state_key(client_id: int) -> str:
+    return f"order_poll_schedule_client_{client_id}"
+
+def webhook_state_key(client_id: int) -> str:
+    return f"last_order_webhook_client_{client_id}"
+
+def _parse_utc(value: str) -> datetime:
+    """Parse our own "...Z" timestamps as naive UTC."""
+    return datetime.fromisoformat(value.rstrip("Z"))
+
+def _format_utc(value: datetime) -> str:
+    return value.isoformat() + "Z"
+
+def next_poll_interval(schedule: dict, changed: int, elapsed_seconds: float) -> tuple[int, float]:
+    """
+    Compute the next polling interval (seconds) and the smoothed order rate
+    (changed orders per hour) after a poll that saw `changed` new or updated
+    orders over `elapsed_seconds`.
+    """
+    observed_rate = changed * 3600.0 / max(elapsed_seconds, ORDER_POLL_MIN_INTERVAL)
+    rate = ORDER_RATE_SMOOTHING * observed_rate + (1 - ORDER_RATE_SMOOTHING) * schedule.get("rate", 0.0)
+
+    if changed:
+        interval = ORDER_POLL_MIN_INTERVAL
+    else:
+        backed_off = schedule.get("interval", ORDER_POLL_MIN_INTERVAL) * ORDER_POLL_BACKOFF
+        # Don't back off past half the expected gap between orders
+        expected_gap = 1800.0 / rate if rate > 0 else ORDER_POLL_MAX_INTERVAL
+        interval = min(backed_off, expected_gap)
+
+    interval = int(max(ORDER_POLL_MIN_INTERVAL, min(ORDER_POLL_MAX_INTERVAL, interval)))
+    return interval, rate
+
+def record_order_poll(db: Session, client_id: int, changed: int, now: datetime | None = None) -> dict:
+    """
+    Update the client's polling schedule after an order sync; committing is
+    left to the caller.
+
+    Args:
+        changed: number of orders the sync created or updated
+        now: when the sync started (defaults to now)
+    """
+    now = now or datetime.utcnow()
+    state = db.query(SyncState).filter_by(key=schedule_state_key(client_id)).first()
+    schedule = json.loads(state.value) if state else {}
+
+    last_poll = _parse_utc(schedule["last_poll_at"]) if schedule.get("last_poll_at") else None
+    elapsed = (now - last_poll).total_seconds() if last_poll else ORDER_POLL_MIN_INTERVAL
+    interval, rate = next_poll_interval(schedule, changed, elapsed)
+
+    schedule = {
+        "interval": interval,
+        "rate": round(rate, 4),
+        "last_poll_at": _format_utc(now),
+        "last_changed": changed,
+        "next_poll_at": _format_utc(now + timedelta(seconds=interval)),
+    }
+    if state:
+        state.value = json.dumps(schedule)
+    else:
+        db.add(SyncState(key=schedule_state_key(client_id), value=json.dumps(schedule)))
+    return schedule
+
+def get_due_clients(db: Session, clients: list[Client], now: datetime | None = None) -> list[Client]:
+    """
+    Clients whose next poll time has passed. Clients without a schedule yet
+    (never synced, or synced before the scheduler existed) are always due.
+    Stores with working webhooks are polled at most every WEBHOOK_RECONCILE_INTERVAL.
+    """
+    now = now or datetime.utcnow()
+    keys = [schedule_state_key(c.id) for c in clients] + [webhook_state_key(c.id) for c in clients]
+    states = {row.key: row.value for row in db.query(SyncState).filter(SyncState.key.in_(keys))}
+
+    due = []
+    for client in clients:
+        schedule = states.get(schedule_state_key(client.id))
+        if client.last_synced_at is None or not schedule:
+            due.append(client)
+            continue
+
+        schedule = json.loads(schedule)
+        next_poll_at = _parse_utc(schedule["next_poll_at"])
+
+        last_webhook = states.get(webhook_state_key(client.id))
+        if last_webhook and (now - _parse_utc(last_webhook)).total_seconds() < WEBHOOK_RECONCILE_INTERVAL:
+            # Webhooks are delivering orders; poll only to reconcile
+            last_poll_at = _parse_utc(schedule["last_poll_at"])
+            next_poll_at = max(next_poll_at, last_poll_at + timedelta(seconds=WEBHOOK_RECONCILE_INTERVAL))
+
+        if now + POLL_DUE_TOLERANCE >= next_poll_at:
+            due.append(client)
+    return due
@@ -1,7 +1,7 @@
 import requests
 from dotenv import load_dotenv
 from database import SessionLocal
-from models import Customer
+from models import Client, Customer, CustomerMetrics, Order
 # from tasks.reorder_messaging import send_whatsapp_reorder_reminder
 from sqlalchemy.orm import sessionmaker
 from prophet import Prophet
@@ -215,6 +215,37 @@ def predict_customers_to_remind(df, orders_df, target_date=None, last_reminded=N
     print(f"📣 {len(reminders)} customers to remind on {today}")
     return reminders, last_reminded
 
+def get_reorder_candidates(session, client_id):
+    """
+    Inputs for predict_customers_to_remind, read from the client's
+    customer_metrics: only customers the predictor can remind (Loyal /
+    Frequent, churn risk not High), and the completed orders of just those
+    customers.
+    """
+    query = (
+        session.query(
+            CustomerMetrics.customer_id,
+            CustomerMetrics.classification,
+            CustomerMetrics.churn_risk,
+            CustomerMetrics.last_order_date,
+        )
+        .filter(
+            CustomerMetrics.client_id == client_id,
+            CustomerMetrics.classification.in_(["Loyal", "Frequent"]),
+            CustomerMetrics.churn_risk != "High",
+        )
+    )
+    df = pd.DataFrame(query.all(), columns=["customer_id", "classification", "churn_risk", "last_order_date"])
+
+    orders = (
+        session.query(Order.customer_id, Order.created_at)
+        .filter(Order.status == "completed", Order.customer_id.in_(df["customer_id"].tolist()))
+        .all()
+    ) if not df.empty else []
+    orders_df = pd.DataFrame(orders, columns=["customer_id", "created_at"])
+    orders_df["created_at"] = pd.to_datetime(orders_df["created_at"])
+    return df, orders_df
+
 def send_reorder_reminders_to_customers(customer_ids: list):
     """
     Sends both English and Arabic WhatsApp reorder reminders to the given customer IDs.
@@ -262,7 +293,17 @@ def run_reorder_prediction_task():
     Combines prediction and message sending.
     """
     
-    customer_ids = predict_customers_to_remind()
+    session = SessionLocal()
+    try:
+        client_ids = [c.id for c in session.query(Client.id).filter(Client.is_active == True).order_by(Client.id)]
+        candidates = [get_reorder_candidates(session, client_id) for client_id in client_ids]
+    finally:
+        session.close()
+
+    customer_ids = []
+    for df, orders_df in candidates:
+        client_customer_ids, _ = predict_customers_to_remind(df, orders_df)
+        customer_ids.extend(client_customer_ids)
     send_reorder_reminders_to_customers(customer_ids)
     
     print(f"✅ Processed reorder prediction for {len(customer_ids)} customers.")
@@ -0,0 +1,172 @@
+"""
+Pre-aggregated sales per client and day, maintained by order ingestion.
+File: tasks/sales_rollup.py
+
+`daily_sales_rollup` holds the order count, revenue and item quantity per
+(client, day, status), and `product_daily_sales_rollup` the quantity and
+revenue per (client, day, status, product). Ingestion adds the changes of every
+page with `SalesRollupDeltas` in the same transaction as the orders themselves,
+so the dashboards can sum days instead of scanning orders and line items.
+`rebuild_daily_sales_rollup` recomputes a client from the orders table, for
+backfills or after drift:
+
+    python -m tasks.sales_rollup [client_id ...]
+"""
+
+import sys
+from datetime import date
+
+from celery import shared_task
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Client, DailySalesRollup, ProductDailySalesRollup
+
+
+class SalesRollupDeltas:
+    """Changes to the sales rollups collected while processing one page of orders."""
+
+    def __init__(self):
+        self.days = {}
+        self.products = {}
+
+    def add(self, day: date, status: str, revenue: float, items: list[dict], sign: int = 1) -> None:
+        """
+        Count an order with its line items (dicts with product_id, product_name,
+        quantity and price) under `status`; sign=-1 takes it out again.
+        """
+        entry = self.days.setdefault((day, status), [0, 0.0, 0])
+        entry[0] += sign
+        entry[1] += sign * revenue
+        for item in items:
+            entry[2] += sign * item["quantity"]
+            key = (day, status, item["product_id"] or 0, item["product_name"])
+            product = self.products.setdefault(key, [0, 0.0])
+            product[0] += sign * item["quantity"]
+            product[1] += sign * item["quantity"] * item["price"]
+
+    def add_order(self, day: date, status: str, revenue: float, items: list[dict]) -> None:
+        self.add(day, status, revenue, items)
+
+    def move_order(self, day: date, old_status: str, new_status: str, revenue: float, items: list[dict]) -> None:
+        """An existing order changed status."""
+        self.add(day, old_status, revenue, items, sign=-1)
+        self.add(day, new_status, revenue, items)
+
+    def apply(self, db: Session, client_id: int) -> None:
+        """Add the collected deltas to the rollups; committing is left to the caller."""
+        # Sorted, so concurrent pages lock rollup rows in the same order
+        rows = [
+            {
+                "client_id": client_id,
+                "day": day,
+                "status": status,
+                "order_count": orders,
+                "revenue": revenue,
+                "item_quantity": quantity,
+            }
+            for (day, status), (orders, revenue, quantity) in sorted(self.days.items())
+            if orders or revenue or quantity
+        ]
+        if rows:
+            stmt = pg_insert(DailySalesRollup).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DailySalesRollup.client_id, DailySalesRollup.day, DailySalesRollup.status],
+                set_={
+                    "order_count": DailySalesRollup.order_count + stmt.excluded.order_count,
+                    "revenue": DailySalesRollup.revenue + stmt.excluded.revenue,
+                    "item_quantity": DailySalesRollup.item_quantity + stmt.excluded.item_quantity,
+                },
+            )
+            db.execute(stmt)
+
+        rows = [
+            {
+                "client_id": client_id,
+                "day": day,
+                "status": status,
+                "product_id": product_id,
+                "product_name": product_name,
+                "quantity": quantity,
+                "revenue": revenue,
+            }
+            for (day, status, product_id, product_name), (quantity, revenue) in sorted(self.products.items())
+            if quantity or revenue
+        ]
+        if rows:
+            table = ProductDailySalesRollup
+            stmt = pg_insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.client_id, table.day, table.status, table.product_id, table.product_name],
+                set_={
+                    "quantity": table.quantity + stmt.excluded.quantity,
+                    "revenue": table.revenue + stmt.excluded.revenue,
+                },
+            )
+            db.execute(stmt)
+
+        self.days.clear()
+        self.products.clear()
+
+
+def rebuild_daily_sales_rollup(db: Session, client_id: int) -> int:
+    """
+    Recompute a client's rollups from its orders; committing is left to the caller.
+    Returns the number of daily rollup rows written.
+    """
+    db.execute(text("DELETE FROM daily_sales_rollup WHERE client_id = :client_id"), {"client_id": client_id})
+    db.execute(text("DELETE FROM product_daily_sales_rollup WHERE client_id = :client_id"), {"client_id": client_id})
+    result = db.execute(text("""
+        INSERT INTO daily_sales_rollup (client_id, day, status, order_count, revenue, item_quantity)
+        SELECT o.client_id, o.created_at::date, o.status,
+               count(*), coalesce(sum(o.total_amount), 0), coalesce(sum(i.quantity), 0)
+        FROM orders o
+        LEFT JOIN (
+            SELECT order_id, sum(quantity) AS quantity
+            FROM order_items
+            WHERE client_id = :client_id
+            GROUP BY order_id
+        ) i ON i.order_id = o.id
+        WHERE o.client_id = :client_id
+        GROUP BY o.client_id, o.created_at::date, o.status
+    """), {"client_id": client_id})
+    db.execute(text("""
+        INSERT INTO product_daily_sales_rollup (client_id, day, status, product_id, product_name, quantity, revenue)
+        SELECT o.client_id, o.created_at::date, o.status, coalesce(oi.product_id, 0), oi.product_name,
+               sum(oi.quantity), sum(oi.quantity * oi.price)
+        FROM order_items oi
+        JOIN orders o ON o.id = oi.order_id
+        WHERE oi.client_id = :client_id AND o.client_id = :client_id
+        GROUP BY o.client_id, o.created_at::date, o.status, coalesce(oi.product_id, 0), oi.product_name
+    """), {"client_id": client_id})
+    return result.rowcount
+
+
+@shared_task(name="rebuild_sales_rollup_task")
+def rebuild_sales_rollup_task(client_id: int = None):
+    """Rebuild the sales rollup of one client, or of every client when `client_id` is None."""
+    db = SessionLocal()
+    rebuilt = {}
+    try:
+        client_ids = [client_id] if client_id else [c.id for c in db.query(Client.id).order_by(Client.id)]
+        for cid in client_ids:
+            rebuilt[cid] = rebuild_daily_sales_rollup(db, cid)
+            db.commit()
+            print(f"📊 Rebuilt sales rollup for client {cid}: {rebuilt[cid]} rows")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Sales rollup rebuild failed: {e}")
+        raise
+    finally:
+        db.close()
+    return rebuilt
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        for arg in sys.argv[1:]:
+            rebuild_sales_rollup_task(int(arg))
+    else:
+        rebuild_sales_rollup_task()
@@ -41,6 +41,7 @@ def send_whatsapp_template(phone_number: str, customer_name: str, order_number:
         print(f"✅ WhatsApp message sent using template '{template_name}'")
     else:
         print(f"❌ Failed to send message: {response.status_code} {response.text}")
+    return response.status_code
 
 def send_whatsapp_template_message(to: str, template_name: str, variables: list[str], language: str = "en_US") -> dict:
 
@@ -6,6 +6,7 @@ import re
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from database import get_db
+from models import Client
 from customers.operation_helper import function_get_dead_customers
 from datetime import datetime
 
@@ -100,11 +101,14 @@ def send_whatsapp_dead_customer_message(phone_number: str, customer_name: str, l
 
 def helper_function_to_sending_message_to_dead_customers(db: Session, language: str = "en"):
     """
-    Fetch dead customers and send them WhatsApp messages.
+    Fetch the dead customers of every active client and send them WhatsApp messages.
     Ensures phone numbers are formatted to Kuwait standard before sending.
     Skips customers with invalid or missing numbers.
     """
-    dead_customers = function_get_dead_customers(db)
+    client_ids = [c.id for c in db.query(Client.id).filter(Client.is_active == True).order_by(Client.id)]
+    dead_customers = [
+        customer for client_id in client_ids for customer in function_get_dead_customers(db, client_id)
+    ]
     results = []
 
     print(f"🚀 Starting dead customer messaging at {datetime.now()} | Found {len(dead_customers)} customers")
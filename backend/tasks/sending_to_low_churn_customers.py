@@ -5,6 +5,7 @@ import requests
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from database import get_db
+from models import Client
 from customers.operation_helper import function_get_customers_with_low_churnRisk
 # from AI.db_helper import fetch_order_data
 # from AI.operation_helper import forecast_customer_purchases
@@ -19,7 +20,10 @@ WHATSAPP_API_URL = f"https://graph.facebook.com/v18.0/{PHONE_NUMBER_ID}/messages
 # LANGUAGE_CODE = "en_US"
 
 def helper_function_to_sending_message_to_low_churn_risk_customers(db: Session):
-    low_churn_customers = function_get_customers_with_low_churnRisk(db)
+    client_ids = [c.id for c in db.query(Client.id).filter(Client.is_active == True).order_by(Client.id)]
+    low_churn_customers = [
+        customer for client_id in client_ids for customer in function_get_customers_with_low_churnRisk(db, client_id)
+    ]
     all_forecasts = []
 
     for customer in low_churn_customers:
@@ -0,0 +1,139 @@
+# benchmark_customer_classification.py
+#
+# Compares the vectorized customer classification (customers/classification.py)
+# with the previous row-wise pandas implementation on synthetic customers, and
+# checks both produce the same labels and response rows. KMeans segmentation
+# is the same for both and is left out of the timings.
+#
+#   cd backend && python -m tests.benchmark_customer_classification [sizes ...]
+
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from customers.classification import classify_customers
+from customers.operation_helper import classify_behavior, calculate_churn_risk, classify_spending
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# Response keys, in the order classification_records builds the columns
+CLASSIFICATION_FIELDS = [
+    "customer_id", "customer_name", "phone", "order_count", "total_spent", "last_order_date",
+    "classification", "churn_risk", "segment", "spending_classification",
+]
+
+
+def synthetic_customers(n: int, today: datetime, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    order_count = rng.choice([0, 1, 1, 2, 3, 5, 8, 20], size=n)
+    days_ago = rng.integers(0, 900, size=n)
+    seconds = rng.integers(0, 86400, size=n)
+    last_order_date = pd.Series(
+        pd.Timestamp(today) - pd.to_timedelta(days_ago, unit="D") - pd.to_timedelta(seconds, unit="s")
+    )
+    last_order_date[order_count == 0] = pd.NaT
+    return pd.DataFrame({
+        "customer_id": np.arange(1, n + 1),
+        "customer_name": [f"Customer {i}" for i in range(n)],
+        "phone": np.where(rng.random(n) < 0.1, None, "9650000000"),
+        "order_count": order_count,
+        "total_spent": np.round(rng.gamma(1.5, 150, size=n) * (order_count > 0), 2),
+        "last_order_date": last_order_date,
+        "segment": "Unsegmented",
+    })
+
+
+def rowwise(df: pd.DataFrame, today: datetime) -> list[dict]:
+    """The classification and response construction as they were before vectorization."""
+    df["classification"] = df.apply(
+        lambda row: classify_behavior(row["order_count"], row["last_order_date"]), axis=1
+    )
+    df["churn_risk"] = df["last_order_date"].apply(lambda x: calculate_churn_risk(x, today))
+    df["spending_classification"] = df["total_spent"].apply(classify_spending)
+    df["recency_days"] = df["last_order_date"].apply(
+        lambda d: (today - d).days if pd.notnull(d) else 999
+    )
+    df["last_order_date"] = df["last_order_date"].apply(
+        lambda x: x.isoformat() if pd.notnull(x) else None
+    )
+    return [
+        {
+            "customer_id": int(row["customer_id"]),
+            "customer_name": str(row["customer_name"]),
+            "phone": row["phone"],
+            "order_count": int(row["order_count"]),
+            "total_spent": float(row["total_spent"]),
+            "last_order_date": row["last_order_date"],
+            "classification": row["classification"],
+            "churn_risk": row["churn_risk"],
+            "segment": row["segment"],
+            "spending_classification": row["spending_classification"]
+        }
+        for _, row in df.iterrows()
+    ]
+
+
+def isoformat_column(values: pd.Series) -> np.ndarray:
+    """datetime.isoformat() of a datetime column, None for NaT."""
+    stamps = values.to_numpy(dtype="datetime64[us]")
+    text = np.datetime_as_string(stamps, unit="s").astype(object)
+    # isoformat() only shows microseconds when there are some
+    with_micros = (values.dt.microsecond != 0).to_numpy()
+    if with_micros.any():
+        text[with_micros] = np.datetime_as_string(stamps[with_micros], unit="us")
+    text[values.isna().to_numpy()] = None
+    return text
+
+
+def classification_records(df: pd.DataFrame) -> list[dict]:
+    """Response rows for the classified frame, built column by column."""
+    columns = [
+        df["customer_id"].astype(int).tolist(),
+        df["customer_name"].astype(str).tolist(),
+        df["phone"].astype(object).where(df["phone"].notna(), None).tolist(),
+        df["order_count"].astype(int).tolist(),
+        df["total_spent"].astype(float).tolist(),
+        isoformat_column(df["last_order_date"]).tolist(),
+        np.asarray(df["classification"]).tolist(),
+        np.asarray(df["churn_risk"]).tolist(),
+        np.asarray(df["segment"]).tolist(),
+        np.asarray(df["spending_classification"]).tolist(),
+    ]
+    return [dict(zip(CLASSIFICATION_FIELDS, row)) for row in zip(*columns)]
+
+
+def vectorized(df: pd.DataFrame, today: datetime) -> list[dict]:
+    return classification_records(classify_customers(df, today))
+
+
+def timed(fn, df: pd.DataFrame, today: datetime):
+    started = time.perf_counter()
+    result = fn(df.copy(), today)
+    return result, time.perf_counter() - started
+
+
+def main(sizes: list[int]) -> int:
+    today = datetime.now()
+    mismatches = 0
+    print(f"{'customers':>10} | {'row-wise':>10} | {'vectorized':>10} | speedup")
+    for n in sizes:
+        df = synthetic_customers(n, today)
+        expected, rowwise_seconds = timed(rowwise, df, today)
+        actual, vectorized_seconds = timed(vectorized, df, today)
+        if actual != expected:
+            mismatches += 1
+            first = next(i for i, (a, b) in enumerate(zip(actual, expected)) if a != b)
+            print(f"❌ {n}: results differ, first at row {first}: {actual[first]} != {expected[first]}")
+        print(f"{n:>10} | {rowwise_seconds:>9.2f}s | {vectorized_seconds:>9.2f}s | {rowwise_seconds / vectorized_seconds:.0f}x")
+
+    if mismatches:
+        return 1
+    print("✅ Vectorized labels match the row-wise implementation")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES))
@@ -0,0 +1,69 @@
+# check_customer_resolution.py
+#
+# Checks that order ingestion attaches an order to the customer who owns its
+# billing phone, even when another customer with the same billing email is
+# already in the sync's identity map (e.g. resolved from an earlier order
+# without a phone). The phone lookup must win, with or without the identity
+# map, as it does for the plain database lookup. Everything is rolled back at
+# the end; point DATABASE_URL at a scratch database migrated to head.
+#
+#   cd backend && python -m tests.check_customer_resolution
+
+import sys
+
+from sqlalchemy.orm import Session
+
+from database import engine
+from models import Client, Customer
+from tasks.fetch_orders import _resolve_customers
+from utils.identity_map import IdentityMap
+
+PHONE = "check-resolution-5555"
+EMAIL = "check-resolution@example.com"
+
+
+def order(phone, email) -> dict:
+    return {"billing": {"first_name": "Check", "last_name": "Resolution", "phone": phone, "email": email}}
+
+
+def main() -> int:
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = Session(bind=connection)
+    failures = 0
+    try:
+        client = Client(email="check-resolution@example.com", hashed_password="x", is_active=True)
+        db.add(client)
+        db.flush()
+        phone_owner = Customer(client_id=client.id, first_name="Phone", last_name="Owner",
+                               phone=PHONE, email="phone-owner@example.com")
+        email_only = Customer(client_id=client.id, first_name="Email", last_name="Only", email=EMAIL)
+        db.add_all([phone_owner, email_only])
+        db.flush()
+
+        # An order without a phone puts the email-only customer in by_email
+        # before the order with both identities is resolved
+        orders = [order(None, EMAIL), order(PHONE, EMAIL)]
+        identity_map = IdentityMap()
+        identity_map.add_customer({
+            "id": email_only.id, "phone": None, "email": EMAIL,
+            "first_name": email_only.first_name, "last_name": email_only.last_name,
+        })
+        for name, cache in (("without identity map", None), ("with identity map", identity_map)):
+            resolved = _resolve_customers(db, orders, client.id, cache)
+            if [customer["id"] for customer in resolved] != [email_only.id, phone_owner.id]:
+                failures += 1
+                print(f"❌ {name}: resolved to customers {[customer['id'] for customer in resolved]}, "
+                      f"expected {[email_only.id, phone_owner.id]}")
+            else:
+                print(f"✅ {name}: the phone owner wins over the cached email match")
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
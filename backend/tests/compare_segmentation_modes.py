@@ -0,0 +1,78 @@
+# compare_segmentation_modes.py
+#
+# Fits the customer segmentation both ways on synthetic customers: in one go
+# (fit_segment_model, KMeans) and over chunks (fit_segment_model_streaming,
+# MiniBatchKMeans.partial_fit), as the nightly refresh does for small and large
+# clients. Both a client's first streaming run (no stored model) and a
+# streaming refit of the stored batch model must give most customers the same
+# segment as the batch fit, and the streaming clustering's inertia must stay
+# close to the batch one. Exits with status 1 otherwise.
+#
+#   cd backend && python -m tests.compare_segmentation_modes [sizes ...]
+
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from customers.classification import (
+    classify_customers, fit_segment_model, fit_segment_model_streaming, assign_segments, SEGMENT_FEATURES,
+)
+from tests.benchmark_customer_classification import synthetic_customers
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+CHUNK_SIZE = 10_000
+# Share of customers that must keep their batch segment under streaming
+MIN_LABEL_AGREEMENT = 0.95
+MAX_INERTIA_RATIO = 1.10
+
+
+def inertia(df, model) -> float:
+    """Sum of squared scaled distances of the customers with orders to their nearest centroid."""
+    features = df.loc[df["order_count"] > 0, SEGMENT_FEATURES].to_numpy(dtype=float)
+    X = (features - model["feature_means"]) / model["feature_scales"]
+    centroids = np.asarray(model["centroids"])
+    return float(((X[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2).min(axis=1).sum())
+
+
+def main(sizes: list[int]) -> int:
+    today = datetime.now()
+    failures = 0
+    print(f"{'customers':>10} | {'batch':>7} | {'streaming':>9} | first-run agreement | inertia ratio | refit agreement")
+    for n in sizes:
+        df = classify_customers(synthetic_customers(n, today), today)
+        with_orders = df[df["order_count"] > 0]
+
+        def chunks():
+            for start in range(0, len(with_orders), CHUNK_SIZE):
+                yield with_orders.iloc[start:start + CHUNK_SIZE]
+
+        started = time.perf_counter()
+        batch = fit_segment_model(df)
+        batch_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        streaming = fit_segment_model_streaming(chunks)
+        streaming_seconds = time.perf_counter() - started
+        warm = fit_segment_model_streaming(chunks, previous=batch)
+
+        batch_segments = assign_segments(df, batch)
+        agreement = (assign_segments(df, streaming) == batch_segments).mean()
+        warm_agreement = (assign_segments(df, warm) == batch_segments).mean()
+        ratio = inertia(df, streaming) / inertia(df, batch)
+        print(
+            f"{n:>10} | {batch_seconds:>6.2f}s | {streaming_seconds:>8.2f}s | {agreement:>19.1%} | "
+            f"{ratio:>13.3f} | {warm_agreement:>15.1%}"
+        )
+        if min(agreement, warm_agreement) < MIN_LABEL_AGREEMENT or ratio > MAX_INERTIA_RATIO:
+            failures += 1
+            print(f"❌ {n}: streaming segmentation is not comparable to the batch one")
+
+    if failures:
+        return 1
+    print("✅ Streaming segmentation is comparable to the batch segmentation")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES))
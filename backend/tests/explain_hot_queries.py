@@ -0,0 +1,202 @@
+# explain_hot_queries.py
+#
+# EXPLAIN regression check for the dashboard queries.
+#
+# Seeds a multi-tenant data set inside a transaction, runs every hot query of
+# orders/, products/ and customers/ db_helper for one tenant, and EXPLAINs the
+# SQL they send. Exits with status 1 if any plan reads a large table with a
+# sequential scan. Everything is rolled back at the end, but point
+# DATABASE_URL at a scratch database migrated to head anyway.
+#
+#   cd backend && python -m tests.explain_hot_queries
+
+import json
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from database import engine
+from orders import db_helper as orders_db
+from products import db_helper as products_db
+from customers import db_helper as customers_db
+from tasks.sales_rollup import rebuild_daily_sales_rollup
+from tasks.customer_metrics import customer_aggregates, rebuild_customer_metrics
+
+# Tenants share the tables, so one tenant's queries must not scan everyone's rows
+SEED_CLIENTS = 20
+SEED_CUSTOMERS_PER_CLIENT = 400
+SEED_ORDERS_PER_CUSTOMER = 5
+SEED_ITEMS_PER_ORDER = 2
+SEED_PRODUCTS_PER_CLIENT = 50
+
+# Tables that must never be read with a sequential scan by a hot query
+LARGE_TABLES = {
+    "orders", "order_items", "customers", "addresses", "products",
+    "daily_sales_rollup", "product_daily_sales_rollup", "customer_metrics",
+}
+
+SEED_SQL = [
+    """
+    INSERT INTO clients (email, hashed_password, is_active)
+    SELECT 'explain-' || c || '@example.com', 'x', true
+    FROM generate_series(1, :clients) c
+    """,
+    """
+    INSERT INTO products (client_id, external_id, name, total_sales, date_modified)
+    SELECT cl.id, p, 'Product ' || p, p, now()
+    FROM clients cl, generate_series(1, :products) p
+    WHERE cl.email LIKE 'explain-%'
+    """,
+    """
+    INSERT INTO customers (client_id, first_name, last_name, email, phone)
+    SELECT cl.id, 'First', 'Last ' || n, 'c' || cl.id || '-' || n || '@example.com', 'explain-' || cl.id || '-' || n
+    FROM clients cl, generate_series(1, :customers) n
+    WHERE cl.email LIKE 'explain-%'
+    """,
+    """
+    INSERT INTO addresses (customer_id, city, country)
+    SELECT cu.id, 'City ' || (cu.id % 30), 'KW'
+    FROM customers cu
+    WHERE cu.phone LIKE 'explain-%'
+    """,
+    """
+    INSERT INTO orders (client_id, customer_id, order_key, status, total_amount, created_at, attribution_referrer)
+    SELECT cu.client_id, cu.id, 'explain-' || cu.id || '-' || n,
+           (ARRAY['completed', 'completed', 'processing', 'cancelled'])[1 + (cu.id + n) % 4],
+           10 + (cu.id * n) % 90, :now - ((cu.id * 7 + n * 31) % 365) * INTERVAL '1 day', 'google.com'
+    FROM customers cu, generate_series(1, :orders) n
+    WHERE cu.phone LIKE 'explain-%'
+    """,
+    """
+    INSERT INTO order_items (order_id, client_id, product_id, product_name, quantity, price)
+    SELECT o.id, o.client_id, 1 + (o.id + n) % :products, 'Product ' || (1 + (o.id + n) % :products), 1 + n, 5
+    FROM orders o, generate_series(1, :items) n
+    WHERE o.order_key LIKE 'explain-%'
+    """,
+]
+
+
+def seed(db: Session) -> int:
+    params = {
+        "clients": SEED_CLIENTS,
+        "customers": SEED_CUSTOMERS_PER_CLIENT,
+        "orders": SEED_ORDERS_PER_CUSTOMER,
+        "items": SEED_ITEMS_PER_ORDER,
+        "products": SEED_PRODUCTS_PER_CLIENT,
+        "now": datetime.utcnow(),
+    }
+    for sql in SEED_SQL:
+        db.execute(text(sql), params)
+    for (client_id,) in db.execute(text("SELECT id FROM clients WHERE email LIKE 'explain-%'")):
+        rebuild_daily_sales_rollup(db, client_id)
+        rebuild_customer_metrics(db, client_id)
+    for table in sorted(LARGE_TABLES):
+        db.execute(text(f"ANALYZE {table}"))
+    return db.execute(text("SELECT min(id) FROM clients WHERE email LIKE 'explain-%'")).scalar()
+
+
+def hot_queries(db: Session, client_id: int) -> dict:
+    """Dashboard helpers to check, keyed by name."""
+    today = datetime.utcnow().date()
+    start, end = str(today - timedelta(days=30)), str(today)
+    customer_id = db.execute(
+        text("SELECT min(id) FROM customers WHERE client_id = :client_id"), {"client_id": client_id}
+    ).scalar()
+    product_id = db.execute(
+        text("SELECT min(id) FROM products WHERE client_id = :client_id"), {"client_id": client_id}
+    ).scalar()
+
+    return {
+        "latest_orders": lambda: orders_db.get_latest_orders_data(db, client_id),
+        "total_orders_count": lambda: orders_db.get_total_orders_count_data(db, client_id),
+        "total_sales": lambda: orders_db.get_total_sales_data(db, client_id),
+        "average_order_value": lambda: orders_db.get_average_order_value_data(db, client_id),
+        "total_customers_count": lambda: orders_db.get_total_customers_count_data(db, client_id),
+        "top_customers": lambda: orders_db.get_top_customers_data(db, client_id),
+        "sales_comparison": lambda: orders_db.get_sales_comparison_data(db, client_id),
+        "orders_in_range": lambda: orders_db.get_orders_in_range_data(db, start, end, "daily", client_id),
+        "attribution_summary": lambda: orders_db.get_attribution_summary(db, client_id),
+        "top_selling_products": lambda: products_db.get_top_selling_products_data(db, client_id),
+        "top_selling_products_inbetween": lambda: products_db.get_top_selling_products_inbetween_data(db, client_id, start, end),
+        "products_sales_table": lambda: products_db.get_products_sales_table_data(db, client_id, start, end),
+        "products_table": lambda: products_db.get_products_table_data(db, client_id),
+        "sales_over_time": lambda: products_db.get_sales_over_time_data(db, client_id, start, end, product_id),
+        "customers_table": lambda: customers_db.customers_table_page_data(db, client_id),
+        "customers_table_filtered": lambda: customers_db.customers_table_page_data(
+            db, client_id, min_orders=2, max_spending=500
+        ),
+        "customers_table_deep_page": lambda: customers_db.customers_table_page_data(
+            db, client_id, sort="name", descending=False, after=("Last 50", customer_id)
+        ),
+        "customer_analysis": lambda: customers_db.get_customer_order_data_for_analysis(db, customer_id),
+        "customer_product_orders": lambda: customers_db.get_customer_product_orders_data(db, customer_id, 1),
+        "customer_aggregates": lambda: customer_aggregates(db, client_id),
+        "customer_classification": lambda: customers_db.get_customer_metrics_data(db, client_id),
+        "dead_customers": lambda: customers_db.get_customer_metrics_data(db, client_id, classification="Dead"),
+    }
+
+
+def sequential_scans(plan: dict) -> list:
+    """Relations read with a Seq Scan anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(sequential_scans(child))
+    return found
+
+
+def main() -> int:
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = Session(bind=connection)
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    failures = 0
+    try:
+        client_id = seed(db)
+        print(f"🌱 Seeded {SEED_CLIENTS} clients, checking queries for client {client_id}")
+        queries = hot_queries(db, client_id)
+
+        event.listen(connection, "before_cursor_execute", capture)
+        for name, run in queries.items():
+            captured.clear()
+            run()
+            statements = list(captured)
+
+            scans = []
+            for statement, parameters in statements:
+                raw = connection.connection.cursor()
+                raw.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+                plan = raw.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scans.extend(t for t in sequential_scans(plan[0]["Plan"]) if t in LARGE_TABLES)
+
+            if scans:
+                failures += 1
+                print(f"❌ {name}: sequential scan on {', '.join(sorted(set(scans)))}")
+            else:
+                print(f"✅ {name}: {len(statements)} statement(s), index scans only")
+        event.remove(connection, "before_cursor_execute", capture)
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+    if failures:
+        print(f"❌ {failures} hot queries fall back to sequential scans")
+        return 1
+    print("✅ No hot query uses a sequential scan")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Per-sync identity map for customers and products used by order ingestion.
+File: utils/identity_map.py
+"""
+
+import os
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from sqlalchemy.orm import Session
+
+from models import Customer, Product
+
+# Upper bound on cached entries per key type (phone, email, product external_id)
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", 50000))
+
+
+class LRUCache:
+    """Small bounded mapping that evicts the least recently used key."""
+
+    def __init__(self, maxsize: int = IDENTITY_CACHE_SIZE):
+        self.maxsize = max(1, maxsize)
+        self._data = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def setdefault(self, key: Hashable, value: Any) -> Any:
+        existing = self.get(key)
+        if existing is not None:
+            return existing
+        self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class IdentityMap:
+    """
+    Customers by normalized phone and email, and the client's known product
+    external_ids, kept for the lifetime of one sync.
+
+    `warm()` loads the client's existing customers and products with one query
+    each, so repeat customers and popular products are resolved with dict
+    lookups instead of a query per page. Only cache misses go to the database,
+    and whatever they find is added back to the map.
+    """
+
+    def __init__(self, maxsize: int = IDENTITY_CACHE_SIZE):
+        self.customers_by_phone = LRUCache(maxsize)
+        self.customers_by_email = LRUCache(maxsize)
+        self.products = LRUCache(maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    def warm(self, db: Session, client_id: int) -> "IdentityMap":
+        """Pre-load the client's most recent customers and products."""
+        maxsize = self.customers_by_phone.maxsize
+        rows = (
+            db.query(Customer.id, Customer.phone, Customer.email, Customer.first_name, Customer.last_name)
+            .filter(Customer.client_id == client_id)
+            .order_by(Customer.id.desc())
+            .limit(maxsize)
+            .all()
+        )
+        # Oldest first, so the email map keeps the lowest id like the IN query does
+        for row in reversed(rows):
+            self.add_customer(dict(row._mapping))
+
+        for (external_id,) in (
+            db.query(Product.external_id)
+            .filter(Product.client_id == client_id, Product.external_id.isnot(None))
+            .order_by(Product.id.desc())
+            .limit(self.products.maxsize)
+        ):
+            self.products.put(external_id, True)
+        return self
+
+    def get_customer(self, phone: Optional[str], email: Optional[str]) -> Optional[dict]:
+        """
+        Cached customer for an order's billing identity. Like the database
+        lookup, the phone wins when present; the email is only used for orders
+        without a phone, since a phone miss still has to be checked in the DB.
+        """
+        if phone:
+            customer = self.customers_by_phone.get(phone)
+        else:
+            customer = self.customers_by_email.get(email) if email else None
+        if customer:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return customer
+
+    def add_customer(self, customer: dict) -> None:
+        if customer.get("phone"):
+            self.customers_by_phone.put(customer["phone"], customer)
+        if customer.get("email"):
+            self.customers_by_email.setdefault(customer["email"], customer)
+
+    def has_product(self, external_id: int) -> bool:
+        return bool(self.products.get(external_id))
+
+    def add_products(self, external_ids) -> None:
+        for external_id in external_ids:
+            self.products.put(external_id, True)
+
+    def clear(self) -> None:
+        """Forget everything, e.g. after a rollback discarded freshly created rows."""
+        self.customers_by_phone.clear()
+        self.customers_by_email.clear()
+        self.products.clear()
@@ -0,0 +1,122 @@
+"""
+Producer/consumer streaming stage used by the WooCommerce sync tasks.
+File: utils/pipeline.py
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+# How many fetched pages may wait for the DB writer before the fetcher blocks
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 4))
+
+_DONE = object()
+
+
+class _Failure:
+    """Wraps an exception raised by the producer so it can be re-raised by the consumer."""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def run_streaming_stage(producer: Iterable, consumer: Callable[[Any], None],
+                        max_queue_size: int = PIPELINE_QUEUE_SIZE) -> dict:
+    """
+    Overlap fetching and processing through a bounded queue.
+
+    `producer` is iterated on a background thread (e.g. WooCommerce page
+    downloads) and every item is handed to `consumer` on the calling thread
+    (e.g. the DB writer, which must keep using the caller's session). When the
+    queue is full the producer blocks, so memory stays bounded when the DB is
+    the slower side. Exceptions from either side stop the stage and are
+    re-raised to the caller.
+
+    Returns:
+        dict with per-stage timings in seconds:
+        - fetch_seconds: time spent producing items
+        - fetch_blocked_seconds: time the producer waited on a full queue (DB-bound)
+        - process_seconds: time spent in `consumer`
+        - process_idle_seconds: time the consumer waited for items (network-bound)
+        - wall_seconds, items and bound_by: "network" or "db", whichever side
+          was busy longer
+    """
+    buffer = queue.Queue(maxsize=max(1, max_queue_size))
+    stop = threading.Event()
+    stats = {
+        "items": 0,
+        "fetch_seconds": 0.0,
+        "fetch_blocked_seconds": 0.0,
+        "process_seconds": 0.0,
+        "process_idle_seconds": 0.0,
+        "wall_seconds": 0.0,
+        "bound_by": None,
+    }
+
+    def put(item) -> None:
+        started = time.perf_counter()
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        stats["fetch_blocked_seconds"] += time.perf_counter() - started
+
+    def produce() -> None:
+        iterator = iter(producer)
+        try:
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    stats["fetch_seconds"] += time.perf_counter() - started
+                put(item)
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+
+    started_at = time.perf_counter()
+    fetcher = threading.Thread(target=produce, name="sync-fetcher", daemon=True)
+    fetcher.start()
+    try:
+        while True:
+            waiting = time.perf_counter()
+            item = buffer.get()
+            stats["process_idle_seconds"] += time.perf_counter() - waiting
+
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.exc
+
+            started = time.perf_counter()
+            consumer(item)
+            stats["process_seconds"] += time.perf_counter() - started
+            stats["items"] += 1
+    finally:
+        stop.set()
+        fetcher.join()
+        stats["wall_seconds"] = time.perf_counter() - started_at
+        stats["bound_by"] = "network" if stats["fetch_seconds"] >= stats["process_seconds"] else "db"
+
+    return stats
+
+
+def format_stage_stats(stats: dict) -> str:
+    """One-line summary of `run_streaming_stage` timings for the task logs."""
+    return (
+        f"{stats['items']} pages in {stats['wall_seconds']:.1f}s | "
+        f"fetch {stats['fetch_seconds']:.1f}s (blocked on DB {stats['fetch_blocked_seconds']:.1f}s) | "
+        f"DB {stats['process_seconds']:.1f}s (idle on network {stats['process_idle_seconds']:.1f}s) | "
+        f"{stats['bound_by']}-bound"
+    )
@@ -0,0 +1,87 @@
+"""
+Redis-backed token bucket shared by every worker that talks to a store
+File: utils/rate_limit.py
+"""
+
+import os
+import time
+from utils.redis_lock import redis_client
+
+# Steady request rate allowed per store, and how many requests may burst above it
+WC_RATE_PER_SECOND = float(os.getenv("WC_RATE_PER_SECOND", 5))
+WC_RATE_BURST = int(os.getenv("WC_RATE_BURST", 10))
+
+# Returns 0 when a token was taken, otherwise the milliseconds to wait.
+# KEYS[1]: bucket hash, KEYS[2]: cooldown key set after a 429 / Retry-After
+# ARGV: rate per second, burst, current time in ms
+_TOKEN_BUCKET_SCRIPT = """
+local blocked = redis.call('PTTL', KEYS[2])
+if blocked > 0 then
+    return blocked
+end
+
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+_token_bucket = redis_client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+
+class StoreRateLimiter:
+    """
+    Token bucket for one store, kept in Redis so all Celery workers share it.
+
+    `acquire()` blocks until a request may be sent. `cooldown()` pauses every
+    worker for the store, e.g. for the Retry-After of a 429. If Redis is
+    unavailable requests are let through rather than stalling the sync.
+    """
+
+    def __init__(self, store_key: str, rate: float = WC_RATE_PER_SECOND, burst: int = WC_RATE_BURST):
+        self.bucket_key = f"wc_rate_bucket:{store_key}"
+        self.cooldown_key = f"wc_rate_cooldown:{store_key}"
+        self.rate = max(0.1, rate)
+        self.burst = max(1, burst)
+
+    def acquire(self) -> float:
+        """Wait for a token; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            try:
+                wait_ms = _token_bucket(
+                    keys=[self.bucket_key, self.cooldown_key],
+                    args=[self.rate, self.burst, int(time.time() * 1000)],
+                )
+            except Exception as e:
+                print(f"⚠️ Rate limiter unavailable, sending request anyway: {e}")
+                return waited
+            if not wait_ms:
+                return waited
+            time.sleep(wait_ms / 1000)
+            waited += wait_ms / 1000
+
+    def cooldown(self, seconds: float) -> None:
+        """Hold back all requests to the store for `seconds`."""
+        try:
+            # Never shorten a longer cooldown set by another worker
+            remaining = redis_client.pttl(self.cooldown_key)
+            if remaining is None or remaining < seconds * 1000:
+                redis_client.set(self.cooldown_key, "1", px=max(1, int(seconds * 1000)))
+        except Exception as e:
+            print(f"⚠️ Could not set rate limit cooldown: {e}")
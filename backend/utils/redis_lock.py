@@ -22,18 +22,19 @@ redis_client = Redis.from_url(
 )
 
 
-def acquire_sync_lock(client_id: int, timeout: int = 300) -> bool:
+def acquire_sync_lock(client_id: int, timeout: int = 300, lock_name: str = "sync_lock") -> bool:
     """
     Acquire a distributed lock for syncing a specific client.
     
     Args:
         client_id: The ID of the client to lock
         timeout: Lock expiration time in seconds (default 5 minutes)
+        lock_name: Lock family, e.g. "sync_lock" for orders, "product_sync_lock" for products
         
     Returns:
         True if lock was acquired, False if already locked
     """
-    lock_key = f"sync_lock_client_{client_id}"
+    lock_key = f"{lock_name}_client_{client_id}"
     try:
         # SET with NX (only set if not exists) and EX (expiration)
         result = redis_client.set(lock_key, "1", nx=True, ex=timeout)
@@ -44,17 +45,18 @@ def acquire_sync_lock(client_id: int, timeout: int = 300) -> bool:
         return False
 
 
-def release_sync_lock(client_id: int) -> bool:
+def release_sync_lock(client_id: int, lock_name: str = "sync_lock") -> bool:
     """
     Release the sync lock for a specific client.
     
     Args:
         client_id: The ID of the client to unlock
+        lock_name: Lock family, e.g. "sync_lock" for orders, "product_sync_lock" for products
         
     Returns:
         True if lock was released, False otherwise
     """
-    lock_key = f"sync_lock_client_{client_id}"
+    lock_key = f"{lock_name}_client_{client_id}"
     try:
         result = redis_client.delete(lock_key)
         return result > 0
@@ -63,17 +65,39 @@ def release_sync_lock(client_id: int) -> bool:
         return False
 
 
-def check_sync_lock(client_id: int) -> bool:
+def extend_sync_lock(client_id: int, timeout: int = 300, lock_name: str = "sync_lock") -> bool:
+    """
+    Push back the expiry of a held sync lock, so long-running syncs
+    keep it while they are still making progress.
+    
+    Args:
+        client_id: The ID of the client
+        timeout: New lock expiration time in seconds from now
+        lock_name: Lock family, e.g. "sync_lock" for orders, "product_sync_lock" for products
+        
+    Returns:
+        True if the lock exists and was extended, False otherwise
+    """
+    lock_key = f"{lock_name}_client_{client_id}"
+    try:
+        return bool(redis_client.expire(lock_key, timeout))
+    except Exception as e:
+        print(f"⚠️ Failed to extend lock for client {client_id}: {e}")
+        return False
+
+
+def check_sync_lock(client_id: int, lock_name: str = "sync_lock") -> bool:
     """
     Check if a sync lock exists for a client without modifying it.
     
     Args:
         client_id: The ID of the client to check
+        lock_name: Lock family, e.g. "sync_lock" for orders, "product_sync_lock" for products
         
     Returns:
         True if lock exists, False otherwise
     """
-    lock_key = f"sync_lock_client_{client_id}"
+    lock_key = f"{lock_name}_client_{client_id}"
     try:
         return redis_client.exists(lock_key) > 0
     except Exception as e:
@@ -81,17 +105,18 @@ def check_sync_lock(client_id: int) -> bool:
         return False
 
 
-def get_lock_ttl(client_id: int) -> Optional[int]:
+def get_lock_ttl(client_id: int, lock_name: str = "sync_lock") -> Optional[int]:
     """
     Get remaining TTL (time to live) for a client's sync lock.
     
     Args:
         client_id: The ID of the client
+        lock_name: Lock family, e.g. "sync_lock" for orders, "product_sync_lock" for products
         
     Returns:
         Remaining seconds until lock expires, or None if no lock exists
     """
-    lock_key = f"sync_lock_client_{client_id}"
+    lock_key = f"{lock_name}_client_{client_id}"
     try:
         ttl = redis_client.ttl(lock_key)
         return ttl if ttl > 0 else None
@@ -0,0 +1,234 @@
+"""
+WooCommerce REST API client shared by the sync tasks.
+File: utils/wc_client.py
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from utils.rate_limit import StoreRateLimiter
+
+# Maximum number of pages fetched in parallel from a single store
+WC_MAX_CONCURRENCY = int(os.getenv("WC_MAX_CONCURRENCY", 4))
+WC_TIMEOUT = float(os.getenv("WC_TIMEOUT", 60.0))
+
+# Per-request retries for throttling (429), server errors and network failures
+WC_MAX_RETRIES = int(os.getenv("WC_MAX_RETRIES", 5))
+WC_RETRY_BASE_DELAY = float(os.getenv("WC_RETRY_BASE_DELAY", 1.0))
+WC_RETRY_MAX_DELAY = float(os.getenv("WC_RETRY_MAX_DELAY", 60.0))
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class WooCommerceAPIError(Exception):
+    """Raised when the WooCommerce API answers with a non-200 status."""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class WooCommerceClient:
+    """
+    Keep-alive HTTP client for one WooCommerce store.
+
+    A single pooled `httpx.Client` is reused for every request, so pages no
+    longer pay a fresh TCP/TLS handshake each time. Requests go through a
+    per-store token bucket shared by all workers, and throttled (429), failing
+    (5xx) or dropped requests are retried individually with jittered backoff,
+    honoring Retry-After, instead of failing the whole sync.
+    """
+
+    def __init__(self, store_url: str, consumer_key: str, consumer_secret: str,
+                 max_concurrency: int = WC_MAX_CONCURRENCY):
+        self.store_url = store_url.rstrip("/")
+        self.max_concurrency = max(1, max_concurrency)
+        self.http = httpx.Client(
+            base_url=f"{self.store_url}/wp-json/wc/v3/",
+            auth=(consumer_key, consumer_secret),
+            timeout=WC_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+        )
+        self.rate_limiter = StoreRateLimiter(urlparse(self.store_url).netloc or self.store_url)
+
+    def request(self, method: str, endpoint: str, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying 429/5xx answers and network errors up to
+        WC_MAX_RETRIES times. Returns the last response; raises the last
+        network error if every attempt failed.
+        """
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                response = self.http.request(method, endpoint, **kwargs)
+            except httpx.TransportError:
+                if attempt >= WC_MAX_RETRIES:
+                    raise
+                response = None
+
+            if response is not None and response.status_code not in RETRYABLE_STATUS_CODES:
+                return response
+            if attempt >= WC_MAX_RETRIES:
+                return response
+
+            # Full jitter keeps workers that were throttled together from retrying together
+            delay = random.uniform(0, min(WC_RETRY_MAX_DELAY, WC_RETRY_BASE_DELAY * 2 ** attempt))
+            retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+            if retry_after is not None:
+                delay = min(WC_RETRY_MAX_DELAY, retry_after) + random.uniform(0, WC_RETRY_BASE_DELAY)
+            if response is not None and response.status_code == 429:
+                # Every worker talking to this store backs off, not just this one
+                self.rate_limiter.cooldown(delay)
+
+            status = response.status_code if response is not None else "network error"
+            print(f"⏳ {self.store_url} {endpoint}: {status}, retrying in {delay:.1f}s ({attempt + 1}/{WC_MAX_RETRIES})")
+            time.sleep(delay)
+            attempt += 1
+
+    def get_page(self, endpoint: str, params: dict, page: int) -> Tuple[list, int]:
+        """
+        Fetch a single page of `endpoint`.
+
+        Returns:
+            (items, total_pages) where total_pages comes from the
+            X-WP-TotalPages header (0 if the store does not send it)
+        """
+        response = self.request("GET", endpoint, params={**params, "page": page})
+        if response.status_code != 200:
+            raise WooCommerceAPIError(response.status_code, response.text)
+
+        total_pages = int(response.headers.get("X-WP-TotalPages") or 0)
+        return response.json(), total_pages
+
+    def get_total(self, endpoint: str, params: Optional[dict] = None) -> Optional[int]:
+        """
+        Number of items `endpoint` currently lists, from the X-WP-Total header
+        of a one-item page. None if the store does not send the header.
+        """
+        response = self.request("GET", endpoint, params={**(params or {}), "per_page": 1, "_fields": "id"})
+        if response.status_code != 200:
+            raise WooCommerceAPIError(response.status_code, response.text)
+
+        total = response.headers.get("X-WP-Total")
+        return int(total) if total else None
+
+    def post(self, endpoint: str, payload: dict) -> dict:
+        """Create a resource (e.g. a webhook) and return the API response."""
+        response = self.request("POST", endpoint, json=payload)
+        if response.status_code not in (200, 201):
+            raise WooCommerceAPIError(response.status_code, response.text)
+        return response.json()
+
+    def put(self, endpoint: str, payload: dict) -> dict:
+        """Update a resource and return the API response."""
+        response = self.request("PUT", endpoint, json=payload)
+        if response.status_code != 200:
+            raise WooCommerceAPIError(response.status_code, response.text)
+        return response.json()
+
+    def delete(self, endpoint: str) -> dict:
+        """Permanently delete a resource (`force=true`) and return the API response."""
+        response = self.request("DELETE", endpoint, params={"force": "true"})
+        if response.status_code != 200:
+            raise WooCommerceAPIError(response.status_code, response.text)
+        return response.json()
+
+    def iter_pages(self, endpoint: str, params: dict, start_page: int = 1,
+                   max_concurrency: Optional[int] = None) -> Iterator[Tuple[int, list, int]]:
+        """
+        Yield (page, items, total_pages) for every page of `endpoint`, in page order.
+
+        The first page is fetched alone to read X-WP-TotalPages; the remaining
+        pages are then fetched concurrently (at most `max_concurrency` in flight)
+        while the caller processes earlier pages. X-WP-TotalPages is only a
+        snapshot: items created or modified during the listing push others
+        further back, so paging continues serially past it until a short or
+        empty page comes back. Stores that do not expose the header are paged
+        that way from the start.
+        """
+        concurrency = max(1, max_concurrency or self.max_concurrency)
+        per_page = int(params.get("per_page") or 10)  # WooCommerce's default page size
+
+        items, total_pages = self.get_page(endpoint, params, start_page)
+        yield start_page, items, total_pages
+        if len(items) < per_page:
+            return
+
+        next_page = start_page + 1
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            try:
+                while next_page <= total_pages and len(pending) < concurrency:
+                    pending.append((next_page, pool.submit(self.get_page, endpoint, params, next_page)))
+                    next_page += 1
+
+                while pending:
+                    page, future = pending.popleft()
+                    items, _ = future.result()
+                    if next_page <= total_pages:
+                        pending.append((next_page, pool.submit(self.get_page, endpoint, params, next_page)))
+                        next_page += 1
+
+                    yield page, items, total_pages
+                    if not items:
+                        return
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+        # The last counted page was full: anything shifted past it is on the next ones
+        while len(items) >= per_page:
+            items, _ = self.get_page(endpoint, params, next_page)
+            yield next_page, items, total_pages
+            next_page += 1
+
+    def close(self) -> None:
+        self.http.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_wc_client(store_url: str, consumer_key: str, consumer_secret: str) -> WooCommerceClient:
+    """
+    Return the pooled client for a store, creating it on first use.
+
+    Clients are cached per worker process, so consecutive syncs of the same
+    store keep reusing warm keep-alive connections.
+    """
+    key = (store_url.rstrip("/"), consumer_key, consumer_secret)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = WooCommerceClient(store_url, consumer_key, consumer_secret)
+            _clients[key] = client
+        return client
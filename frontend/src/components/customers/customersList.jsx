@@ -1,43 +1,52 @@
 import { useState, useEffect } from "react";
-import axios from "axios";
-import API_BASE_URL from "../../../api_config";
+import api from "../../../api_config";
 import MessagingCustomerClassificationTables from "../customers/Messaging_customer_classsification";
 
+// The customers table is read from the server one page at a time
+const ROWS_PER_PAGE = 20;
+// Page size used when walking every page to select all matching customers
+const SELECT_ALL_PAGE_SIZE = 200;
+
 const CustomerList = ({ onSelectCustomers }) => {
   const [customers, setCustomers] = useState([]);
   const [selected, setSelected] = useState(new Set()); // ✅ shared state
   const [filter, setFilter] = useState("");
 
-  // Pagination
-  const [currentPage, setCurrentPage] = useState(1);
-  const rowsPerPage = 20;
+  // Keyset pagination: cursors of the pages visited so far, and of the next one
+  const [cursors, setCursors] = useState([null]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const currentPage = cursors.length;
+
+  const fetchPage = (cursor, limit) =>
+    api.get("/customers-table", {
+      params: {
+        limit,
+        cursor: cursor ?? undefined,
+        search: filter.trim() || undefined,
+      },
+    });
+
+  // Start over from the first page when the search changes
+  useEffect(() => {
+    setCursors([null]);
+  }, [filter]);
 
   useEffect(() => {
-    axios
-      .get(`${API_BASE_URL}/customers-table`)
-      .then((res) => setCustomers(res.data))
-      .catch((err) => console.error(err));
-  }, []);
+    const timer = setTimeout(() => {
+      fetchPage(cursors[cursors.length - 1], ROWS_PER_PAGE)
+        .then((res) => {
+          setCustomers(res.data.items);
+          setNextCursor(res.data.next_cursor);
+        })
+        .catch((err) => console.error(err));
+    }, 300); // wait for typing to pause
+    return () => clearTimeout(timer);
+  }, [cursors]);
 
   useEffect(() => {
     onSelectCustomers(Array.from(selected)); // send selected ids to parent
   }, [selected]);
 
-  // Filtering
-  const filteredCustomers = customers.filter(
-    (c) =>
-      c.user.toLowerCase().includes(filter.toLowerCase()) ||
-      c.phone.includes(filter)
-  );
-
-  // Pagination calculations
-  const totalPages = Math.ceil(filteredCustomers.length / rowsPerPage);
-  const startIndex = (currentPage - 1) * rowsPerPage;
-  const currentCustomers = filteredCustomers.slice(
-    startIndex,
-    startIndex + rowsPerPage
-  );
-
   // Selection logic
   const toggleSelect = (id) => {
     setSelected((prev) => {
@@ -47,18 +56,30 @@ const CustomerList = ({ onSelectCustomers }) => {
     });
   };
 
-  const selectAll = () => {
-    setSelected(new Set(filteredCustomers.map((c) => c.id)));
+  // Every customer matching the search, not just the page on screen
+  const selectAll = async () => {
+    try {
+      const ids = new Set();
+      let cursor = null;
+      do {
+        const res = await fetchPage(cursor, SELECT_ALL_PAGE_SIZE);
+        res.data.items.forEach((c) => ids.add(c.id));
+        cursor = res.data.next_cursor;
+      } while (cursor);
+      setSelected(ids);
+    } catch (err) {
+      console.error(err);
+    }
   };
 
   const unselectAll = () => setSelected(new Set());
 
   const goToPrevPage = () => {
-    if (currentPage > 1) setCurrentPage(currentPage - 1);
+    if (currentPage > 1) setCursors((prev) => prev.slice(0, -1));
   };
 
   const goToNextPage = () => {
-    if (currentPage < totalPages) setCurrentPage(currentPage + 1);
+    if (nextCursor) setCursors((prev) => [...prev, nextCursor]);
   };
 
   return (
@@ -106,7 +127,7 @@ const CustomerList = ({ onSelectCustomers }) => {
             </tr>
           </thead>
           <tbody>
-            {currentCustomers.map((c) => (
+            {customers.map((c) => (
               <tr
                 key={c.id}
                 className={`hover:bg-gray-50 ${
@@ -124,7 +145,7 @@ const CustomerList = ({ onSelectCustomers }) => {
                 <td className="p-2 border">{c.phone}</td>
               </tr>
             ))}
-            {currentCustomers.length === 0 && (
+            {customers.length === 0 && (
               <tr>
                 <td colSpan="3" className="p-4 text-center text-gray-500">
                   No customers found.
@@ -145,11 +166,11 @@ const CustomerList = ({ onSelectCustomers }) => {
           Previous
         </button>
         <span className="text-sm">
-          Page {currentPage} of {totalPages}
+          Page {currentPage}
         </span>
         <button
           onClick={goToNextPage}
-          disabled={currentPage === totalPages}
+          disabled={!nextCursor}
           className="px-4 py-2 bg-gray-200 rounded disabled:opacity-50 hover:bg-gray-300"
         >
           Next
@@ -7,71 +7,60 @@ import CustomerSpendingClassificationTables from "../components/customers/Custom
 import api from "../../api_config";
 import { useTranslation } from 'react-i18next';
 
+// Rows per page of the customers table, fetched from the server one page at a time
+const PAGE_SIZE = 10;
+
 function CustomerAnalysis() {
   const [customers, setCustomers] = useState([]);
-  const [filteredCustomers, setFilteredCustomers] = useState([]);
   const [searchTerm, setSearchTerm] = useState('');
 
   // Filters use `null` for "not set"
   const [orderFilter, setOrderFilter] = useState({ min: null, max: null });
   const [spendingFilter, setSpendingFilter] = useState({ min: null, max: null });
 
+  // Keyset pagination: cursors of the pages visited so far, and of the next one
+  const [cursors, setCursors] = useState([null]);
+  const [nextCursor, setNextCursor] = useState(null);
+
   const { t } = useTranslation("customerAnalysis");
+  const page = cursors.length - 1;
 
-  // 🔄 Fetch customers
+  // 🔄 Start over from the first page when the search or a filter changes
   useEffect(() => {
-    async function fetchCustomers() {
-      try {
-        const res = await api.get("/customers-table");
-        setCustomers(res.data);
-        setFilteredCustomers(res.data);
+    setCursors([null]);
+  }, [searchTerm, orderFilter, spendingFilter]);
 
+  // 🔄 Fetch the current page; search and filters are applied by the server
+  useEffect(() => {
+    const timer = setTimeout(async () => {
+      try {
+        const res = await api.get("/customers-table", {
+          params: {
+            limit: PAGE_SIZE,
+            cursor: cursors[page] ?? undefined,
+            search: searchTerm.trim() || undefined,
+            min_orders: orderFilter.min ?? undefined,
+            max_orders: orderFilter.max ?? undefined,
+            min_spending: spendingFilter.min ?? undefined,
+            max_spending: spendingFilter.max ?? undefined,
+          },
+        });
+        setCustomers(res.data.items);
+        setNextCursor(res.data.next_cursor);
       } catch (err) {
         console.error("Error fetching customers", err);
       }
-    }
-    fetchCustomers();
-  }, []);
+    }, 300); // wait for typing to pause
+    return () => clearTimeout(timer);
+  }, [cursors]);
 
-  // 🔍 Filter when searchTerm changes
-  useEffect(() => {
-  const rawSearch = searchTerm.trim().toLowerCase();
-  const digitSearch = rawSearch.replace(/\D/g, '');
-
-  const filtered = customers.filter((customer) => {
-    const name = (customer.user || '').toLowerCase();
-    const phone = (customer.phone || '').replace(/\D/g, '');
-    const orders = Number(customer.total_orders ?? 0); // make sure API has this field
-    const spending = Number(customer.total_spending ?? 0); // adjust key based on your API
-
-    const isNameMatch = name.includes(rawSearch);
-    const isPhoneMatch = digitSearch && phone.includes(digitSearch);
-    const passesSearch = 
-        !rawSearch || isNameMatch || isPhoneMatch;
-
-    // ✅ Orders filter
-    const passesOrderMin =
-      orderFilter.min === null || orders >= orderFilter.min;
-    const passesOrderMax =
-      orderFilter.max === null || orders <= orderFilter.max;
-
-    // ✅ Spending filter
-    const passesSpendingMin =
-      spendingFilter.min === null || spending >= spendingFilter.min;
-    const passesSpendingMax =
-      spendingFilter.max === null || spending <= spendingFilter.max;
-
-    return (
-      passesSearch &&
-      passesOrderMin &&
-      passesOrderMax &&
-      passesSpendingMin &&
-      passesSpendingMax
-    );
-  });
-
-    setFilteredCustomers(filtered);
-      }, [searchTerm, customers, orderFilter, spendingFilter]);
+  const goToNextPage = () => {
+    if (nextCursor) setCursors((prev) => [...prev, nextCursor]);
+  };
+
+  const goToPrevPage = () => {
+    if (page > 0) setCursors((prev) => prev.slice(0, -1));
+  };
 
     const clearFilters = () => {
       setSearchTerm("");
@@ -186,7 +175,24 @@ function CustomerAnalysis() {
         </div>
       </div>
 
-      <CustomersTable customers={filteredCustomers}/>
+      <CustomersTable customers={customers}/>
+      <div className="flex justify-between items-center max-w-3xl mb-6">
+        <button
+          onClick={goToPrevPage}
+          disabled={page === 0}
+          className="px-4 py-2 bg-gray-200 rounded disabled:opacity-50 hover:bg-gray-300"
+        >
+          {t("previous")}
+        </button>
+        <span className="text-sm">{t("page")} {page + 1}</span>
+        <button
+          onClick={goToNextPage}
+          disabled={!nextCursor}
+          className="px-4 py-2 bg-gray-200 rounded disabled:opacity-50 hover:bg-gray-300"
+        >
+          {t("next")}
+        </button>
+      </div>
       <div className="flex justify-center my-8">
         <div className="bg-gradient-to-r from-blue-100 to-blue-200 border border-blue-300 shadow-md rounded-2xl px-6 py-4 text-center w-full max-w-3xl">
           <h3 className="text-2xl font-bold text-blue-800 tracking-wide">